@@ -0,0 +1,132 @@
+"""Overview calls and alert latency: fixed 5 minute polling vs. AdaptivePollScheduler, in simulated time.
+
+Generates price paths for many tokens in 10 second steps, mostly quiet random walks with occasional pumps, and polls
+every token either every ``--interval`` seconds or when the adaptive scheduler says so. A crossing is a step where a
+token's 5m change reaches its lowest holder threshold; its latency is the time until a poll first sees the change
+at or over the threshold, a crossing that falls back before any poll sees it is missed.
+
+Run from the repository root:
+
+    uv run python -m benchmarks.bench_adaptive_polling [--tokens 2000 --hours 6]
+"""
+
+from typing import Callable, Dict, List, Optional
+import argparse
+import math
+import random
+import statistics
+
+from src.alerts.polling import AdaptivePollScheduler
+from src.sol_data.data_models import TokenOverviewResponse
+
+STEP = 10  # seconds
+
+
+class TokenPath:
+    def __init__(self, rng: random.Random, steps: int, pump_rate: float) -> None:
+        self.threshold = rng.choice([5.0, 10.0, 20.0])
+        active = self.active = rng.random() < 0.2
+        volatility = rng.uniform(0.002, 0.006) if active else rng.uniform(0.0002, 0.001)
+        self.trades = rng.randint(50, 2000) if active else rng.randint(0, 8)
+
+        drift = [0.0] * steps
+        for _ in range(sum(1 for _ in range(steps // 360) if rng.random() < pump_rate)):
+            start, length, per_step = rng.randrange(steps), rng.randint(6, 60), rng.uniform(0.003, 0.02)
+            for i in range(start, min(steps, start + length)):
+                drift[i] += per_step
+        self.prices = [1.0]
+        for i in range(1, steps):
+            self.prices.append(self.prices[-1] * math.exp(drift[i] + rng.gauss(0, volatility)))
+
+    def change(self, step: int, window: int) -> float:
+        return (self.prices[step] / self.prices[max(0, step - window // STEP)] - 1) * 100
+
+    def overview(self, step: int) -> TokenOverviewResponse:
+        pumping = self.change(step, 60) > 1
+        return TokenOverviewResponse(
+            priceChange5mPercent=self.change(step, 300),
+            priceChange1mPercent=self.change(step, 60),
+            trade5m=self.trades * (10 if pumping else 1),
+            uniqueWallet5m=self.trades // 3 * (10 if pumping else 1),
+        )
+
+
+def simulate(paths: List[TokenPath], steps: int, next_poll: Callable[[TokenPath, int], int], rng: random.Random) -> Dict[str, float]:
+    calls, latencies, missed = 0, [], 0
+    for path in paths:
+        polls = set()
+        step = rng.randrange(300 // STEP)  # first poll somewhere in the first sweep, like the sweep slots
+        while step < steps:
+            polls.add(step)
+            calls += 1
+            step += max(1, next_poll(path, step))
+
+        above = False
+        pending: Optional[int] = None
+        for step in range(steps):
+            now_above = path.change(step, 300) >= path.threshold
+            if now_above and not above:
+                pending = step
+            if pending is not None:
+                if not now_above:
+                    missed += 1
+                    pending = None
+                elif step in polls:
+                    latencies.append((step - pending) * STEP)
+                    pending = None
+            above = now_above
+
+    latencies.sort()
+    return {
+        "tokens": len(paths),
+        "calls": calls,
+        "detected": len(latencies),
+        "missed": missed,
+        "p50": statistics.median(latencies) if latencies else 0.0,
+        "p90": latencies[int(len(latencies) * 0.9)] if latencies else 0.0,
+        "mean": statistics.fmean(latencies) if latencies else 0.0,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--hours", type=float, default=6)
+    parser.add_argument("--interval", type=float, default=300, help="fixed polling interval and the scheduler's base interval")
+    parser.add_argument("--pump-rate", type=float, default=0.3, help="chance per token and hour of a pump")
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    steps = int(args.hours * 3600 / STEP)
+    rng = random.Random(args.seed)
+    paths = [TokenPath(rng, steps, args.pump_rate) for _ in range(args.tokens)]
+
+    poller = AdaptivePollScheduler(base_interval=args.interval)
+
+    def fixed(path: TokenPath, step: int) -> int:
+        return round(args.interval / STEP)
+
+    def adaptive(path: TokenPath, step: int) -> int:
+        overview = path.overview(step)
+        return round(poller.interval(overview, {"5m": path.threshold}, {"5m": overview.priceChange5mPercent}) / STEP)
+
+    print(f"{args.tokens} tokens over {args.hours:g}h, latencies in seconds")
+    print(f"{'':<18}{'tokens':>8}{'calls':>10}{'detected':>10}{'missed':>8}{'p50':>6}{'p90':>6}{'mean':>6}")
+    totals = {}
+    for group, members in (("active", [p for p in paths if p.active]), ("quiet", [p for p in paths if not p.active]), ("all", paths)):
+        for name, policy in (("fixed", fixed), ("adaptive", adaptive)):
+            result = totals[group, name] = simulate(members, steps, policy, random.Random(args.seed))
+            print(
+                f"{group + ' ' + name:<18}{result['tokens']:>8}{result['calls']:>10}{result['detected']:>10}{result['missed']:>8}"
+                f"{result['p50']:>6.0f}{result['p90']:>6.0f}{result['mean']:>6.0f}"
+            )
+    before, after = totals["all", "fixed"], totals["all", "adaptive"]
+    moving_before, moving_after = totals["active", "fixed"], totals["active", "adaptive"]
+    print(
+        f"adaptive makes {after['calls'] / before['calls']:.2f}x the calls, "
+        f"mean latency on active tokens {moving_after['mean'] / max(moving_before['mean'], 1):.2f}x, overall {after['mean'] / max(before['mean'], 1):.2f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""End-to-end alert cycle benchmark against the local fake Birdeye server.
+
+Runs full sweep cycles over N generated users, then every user's /alert check (``check_user_alerts``) on its own,
+and reports cycle wall time, Birdeye calls per user, p50/p99 per-user latency and peak memory. With ``--replay`` the
+users are the wallets of a recording made with BIRDEYE_RECORD_PATH and every response comes from that recording.
+
+Run from the repository root:
+
+    uv run python -m benchmarks.bench_alert_cycle --users 500 --latency 0.05 --rate-limit 0
+    uv run python -m benchmarks.bench_alert_cycle --replay birdeye.jsonl.gz --replay-timing original
+"""
+
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import json
+import logging
+import random
+import resource
+import statistics
+import time
+import tracemalloc
+import urllib.request
+
+from benchmarks.fake_birdeye import add_config_arguments, config_from_args, start_in_process, wallet_address
+from src.alerts.planner import AlertCyclePlanner, Subscriber
+from src.alerts.prefilter import PricePrefilter
+from src.discord.logger import logger
+from src.sol_data.concurrency import gather_bounded
+from src.sol_data.data_manager import BIRDEYE_REQUESTS, DataManager
+from src.sol_data.metadata_store import TokenMetadataStore
+
+
+def _server_call(base_url: str, path: str, method: str = "GET") -> Dict[str, Any]:
+    with urllib.request.urlopen(urllib.request.Request(f"{base_url}{path}", method=method), timeout=5) as r:
+        return json.loads(r.read())
+
+
+def _client_calls() -> Dict[str, int]:
+    """Requests DataManager made so far by endpoint, plus failed ones under "errors" """
+    calls: Dict[str, int] = {}
+    for (endpoint, outcome), count in BIRDEYE_REQUESTS.values().items():
+        calls[endpoint] = calls.get(endpoint, 0) + int(count)
+        if outcome == "error":
+            calls["errors"] = calls.get("errors", 0) + int(count)
+    return calls
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+async def run(args: argparse.Namespace, base_url: Optional[str]) -> Dict[str, Any]:
+    dm = DataManager(
+        base_url=base_url or "http://replay.invalid",
+        rate_limit=args.client_rate_limit,
+        rate_burst=max(1, int(args.client_rate_limit)),
+        record_path=None,
+        replay_path=args.replay,
+        replay_timing=args.replay_timing,
+    )
+    planner = AlertCyclePlanner(
+        dm,
+        TokenMetadataStore(dm, max_concurrency=args.concurrency),
+        prefilter=None if args.no_prefilter else PricePrefilter(dm),
+        max_concurrency=args.concurrency,
+    )
+    rng = random.Random(args.seed)
+    if dm.replayer is not None:
+        wallets = sorted(params["wallet"] for params in dm.replayer.params_for("/v1/wallet/token_list"))[: args.users]
+    else:
+        wallets = [wallet_address(i, args.seed) for i in range(args.users)]
+    subscribers = [Subscriber(i + 1, wallet, rng.choice([5.0, 10.0, 20.0, 50.0])) for i, wallet in enumerate(wallets)]
+    args.users = len(subscribers)
+
+    report: Dict[str, Any] = {"users": args.users, "cycles": []}
+    try:
+        for cycle in range(args.cycles):
+            before = _client_calls()
+            if base_url is not None:
+                _server_call(base_url, "/_reset", "POST")
+            started = time.perf_counter()
+            alerts = await planner.run(subscribers)
+            wall = time.perf_counter() - started
+            if base_url is not None:
+                server = _server_call(base_url, "/_stats")
+            else:
+                counts = {endpoint: count - before.get(endpoint, 0) for endpoint, count in _client_calls().items()}
+                errors = counts.pop("errors", 0)
+                server = {"counts": {endpoint: count for endpoint, count in counts.items() if count}, "errors": errors, "rate_limited": 0}
+            calls = sum(server["counts"].values())
+            report["cycles"].append(
+                {
+                    "cycle": cycle + 1,
+                    "wall_seconds": wall,
+                    "calls": calls,
+                    "calls_per_user": calls / args.users,
+                    "calls_by_endpoint": server["counts"],
+                    "server_errors": server["errors"],
+                    "rate_limited": server["rate_limited"],
+                    "alerts": sum(len(user_alerts) for user_alerts in alerts.values()),
+                    "stats": vars(planner.last_stats),
+                }
+            )
+
+        # Every user asking /alert at once, like the slash command does, with the caches the sweep left behind
+        async def check_user_alerts(subscriber: Subscriber) -> float:
+            started = time.perf_counter()
+            await planner.run([subscriber], apply_cooldown=False)
+            return time.perf_counter() - started
+
+        latencies = [latency for latency in await gather_bounded(check_user_alerts, subscribers, args.user_concurrency) if isinstance(latency, float)]
+        report["per_user"] = {
+            "p50_ms": _percentile(latencies, 50) * 1000,
+            "p99_ms": _percentile(latencies, 99) * 1000,
+            "max_ms": max(latencies, default=0.0) * 1000,
+            "failed": len(subscribers) - len(latencies),
+        }
+    finally:
+        await dm.close()
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--cycles", type=int, default=2, help="later cycles run with warm caches and prefilter history")
+    parser.add_argument("--concurrency", type=int, default=10, help="planner max_concurrency")
+    parser.add_argument("--user-concurrency", type=int, default=20, help="simultaneous /alert checks")
+    parser.add_argument("--client-rate-limit", type=float, default=0.0, help="DataManager requests per second, 0 disables")
+    parser.add_argument("--no-prefilter", action="store_true")
+    parser.add_argument("--tracemalloc", action="store_true", help="report the peak Python heap, at the cost of slower runs")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--replay", help="serve responses from this BIRDEYE_RECORD_PATH recording instead of the fake server")
+    parser.add_argument("--replay-timing", choices=["fast", "original"], default="fast")
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+    args.wallets = max(args.wallets, args.users)
+
+    logger.setLevel(logging.WARNING)
+    server = None if args.replay else start_in_process(config_from_args(args), port=args.port)
+    try:
+        if args.tracemalloc:
+            tracemalloc.start()
+        report = asyncio.run(run(args, None if server is None else f"http://127.0.0.1:{args.port}"))
+        if args.tracemalloc:
+            report["peak_heap_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+        report["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    finally:
+        if server is not None:
+            server.terminate()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    for cycle in report["cycles"]:
+        endpoints = ", ".join(f"{path}={count}" for path, count in sorted(cycle["calls_by_endpoint"].items()))
+        print(
+            f"cycle {cycle['cycle']}: {cycle['wall_seconds']:.2f}s, {cycle['calls_per_user']:.2f} calls/user, "
+            f"{cycle['alerts']} alerts, {cycle['server_errors']} errors, {cycle['rate_limited']} rate limited ({endpoints})"
+        )
+    per_user = report["per_user"]
+    print(f"per-user check: p50 {per_user['p50_ms']:.1f}ms, p99 {per_user['p99_ms']:.1f}ms, max {per_user['max_ms']:.1f}ms, {per_user['failed']} failed")
+    memory = f"peak RSS {report['peak_rss_mb']:.1f} MB"
+    if "peak_heap_mb" in report:
+        memory += f", peak Python heap {report['peak_heap_mb']:.1f} MB"
+    print(memory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""CPU and memory per /defi/token_overview response: full model vs. the projection the alert path uses.
+
+Run from the repository root:
+
+    uv run python -m benchmarks.bench_overview_parsing [--responses 2000]
+"""
+
+from typing import Any, Callable, Dict, List, Optional, get_args
+import argparse
+import gc
+import json
+import random
+import timeit
+import tracemalloc
+
+from src.alerts.planner import OVERVIEW_FIELDS
+from src.sol_data.data_manager import _envelope
+from src.sol_data.data_models import TokenExtensions, TokenOverviewResponse, project_model
+
+
+def fake_value(annotation: Any, rng: random.Random) -> Any:
+    kind = next((arg for arg in get_args(annotation) if arg is not type(None)), annotation)
+    if kind is bool:
+        return rng.random() < 0.5
+    if kind is int:
+        return rng.randrange(10**9)
+    if kind is float:
+        return rng.uniform(-100, 10**6)
+    if kind is str:
+        return "".join(rng.choices("abcdefghijkmnopqrstuvwxyzABCDEFGHJKLMNPQRSTUVWXYZ123456789", k=44))
+    if kind is TokenExtensions:
+        return {name: fake_value(info.annotation, rng) for name, info in TokenExtensions.model_fields.items()}
+    return None
+
+
+def fake_overview_body(seed: int) -> bytes:
+    """A token_overview response with every field of TokenOverviewResponse filled in"""
+    rng = random.Random(seed)
+    data = {name: fake_value(info.annotation, rng) for name, info in TokenOverviewResponse.model_fields.items()}
+    return json.dumps({"success": True, "data": data}).encode()
+
+
+def parse_full(body: bytes) -> TokenOverviewResponse:
+    """What get_token_overview did before: decode everything, validate everything"""
+    return TokenOverviewResponse(**json.loads(body)["data"])
+
+
+def parse_projection(body: bytes):
+    return _envelope(project_model(TokenOverviewResponse, frozenset(OVERVIEW_FIELDS))).model_validate_json(body).data
+
+
+def measure(parse: Callable[[bytes], Any], bodies: List[bytes], repeat: int) -> Dict[str, float]:
+    per_call = min(timeit.repeat(lambda: [parse(body) for body in bodies], number=1, repeat=repeat)) / len(bodies)
+
+    gc.collect()
+    tracemalloc.start()
+    kept = [parse(body) for body in bodies]  # like the overview cache holding them
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+
+    return {"us": per_call * 1e6, "retained": retained / len(bodies), "peak": peak / len(bodies)}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--responses", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    bodies = [fake_overview_body(seed) for seed in range(args.responses)]
+    print(f"{args.responses} responses, {sum(map(len, bodies)) / len(bodies):.0f} bytes each, {len(TokenOverviewResponse.model_fields)} fields")
+
+    full = measure(parse_full, bodies, args.repeat)
+    projection = measure(parse_projection, bodies, args.repeat)
+
+    print(f"{'':<12}{'us/response':>14}{'retained B':>14}{'peak B':>12}")
+    for name, result in (("full", full), ("projection", projection)):
+        print(f"{name:<12}{result['us']:>14.1f}{result['retained']:>14.0f}{result['peak']:>12.0f}")
+    print(
+        f"projection saves {full['us'] - projection['us']:.1f} us ({full['us'] / projection['us']:.1f}x) "
+        f"and {full['retained'] - projection['retained']:.0f} retained bytes per response"
+    )
+
+
+if __name__ == "__main__":
+    main()
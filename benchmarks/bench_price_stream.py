@@ -0,0 +1,136 @@
+"""Threshold crossings seen through the Birdeye price stream, against the local fake Birdeye server.
+
+Sets up ``--users`` users and runs one sweep, which polls every held token and subscribes them to the fake price
+websocket. Then it runs a sweep with the stream live, moves ``--moves`` held tokens past their holders' thresholds one
+after the other and times how long until ``early_holders`` reports a holder, and finally drops every socket to show
+the fallback: the next sweep polls the tokens again until the stream has reconnected. Polling alone notices a
+crossing only at the token's next poll, on average half an interval (150s with the default 5 minute sweep) later.
+
+Run from the repository root:
+
+    uv run python -m benchmarks.bench_price_stream [--users 300 --moves 20 --stream-interval 0.5]
+"""
+
+from typing import Dict, List, Optional
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import statistics
+import time
+import urllib.request
+
+from benchmarks.fake_birdeye import FakeBirdeyeConfig, start_in_process, wallet_address
+from src.alerts.planner import AlertCyclePlanner, Subscriber
+from src.alerts.polling import AdaptivePollScheduler
+from src.discord.logger import logger
+from src.sol_data.data_manager import DataManager
+from src.sol_data.price_stream import PriceStream
+
+
+def _server_call(base_url: str, path: str, method: str = "GET") -> Dict:
+    with urllib.request.urlopen(urllib.request.Request(f"{base_url}{path}", method=method), timeout=5) as r:
+        return json.loads(r.read())
+
+
+async def _wait_until(condition, timeout: float) -> float:
+    started = time.perf_counter()
+    while not condition():
+        if time.perf_counter() - started > timeout:
+            raise TimeoutError("condition not met")
+        await asyncio.sleep(0.01)
+    return time.perf_counter() - started
+
+
+async def _sweep(planner: AlertCyclePlanner, subscribers: List[Subscriber], base_url: str) -> Dict:
+    _server_call(base_url, "/_reset", "POST")
+    await planner.run(subscribers)
+    counts = _server_call(base_url, "/_stats")["counts"]
+    stats = planner.last_stats
+    polled = stats.unique_tokens - stats.streamed_tokens - stats.deferred_tokens
+    return {"overview_calls": counts.get("/defi/token_overview", 0), "streamed": stats.streamed_tokens, "polled": polled, "tokens": stats.unique_tokens}
+
+
+async def run(args: argparse.Namespace, base_url: str) -> None:
+    dm = DataManager(base_url=base_url, rate_limit=0, record_path=None, replay_path=None)
+    planner = AlertCyclePlanner(dm, poller=AdaptivePollScheduler())
+    rng = random.Random(args.seed)
+    subscribers = [Subscriber(i + 1, wallet_address(i, args.seed), args.threshold, "1m") for i in range(args.users)]
+    try:
+        initial = await _sweep(planner, subscribers, base_url)
+        tokens = len(planner.index)
+        planner.stream = PriceStream(
+            planner.observe_price, url=base_url.replace("http", "ws") + "/socket/solana", max_connections=math.ceil(tokens / 100)
+        )
+        planner.stream.update(planner.index.tokens())
+        planner.stream.start()
+        subscribed = await _wait_until(lambda: planner.stream.live_tokens() == tokens, 30)
+        # One streamed price per token, so the history knows where every token stands now
+        await asyncio.sleep(args.stream_interval * 2)
+        await planner.streamed_holders()
+        print(f"{args.users} users, {tokens} tokens on {len(planner.stream.connections)} connections, subscribed in {subscribed:.2f}s")
+        print(f"sweep polling everything: {initial['overview_calls']} overview calls")
+        streamed = await _sweep(planner, subscribers, base_url)
+        print(f"sweep with the stream live: {streamed['overview_calls']} overview calls, {streamed['streamed']} of {streamed['tokens']} tokens streamed")
+
+        latencies = []
+        for address in rng.sample(sorted(planner.index.tokens()), args.moves):
+            holders = set(planner.index.holders(address))
+            _server_call(base_url, f"/_move?address={address}&percent={args.percent}", "POST")
+            started = time.perf_counter()
+            while True:
+                await planner.wait_for_crossing(5)
+                if holders & await planner.streamed_holders():
+                    latencies.append(time.perf_counter() - started)
+                    break
+                if time.perf_counter() - started > 30:
+                    print(f"no crossing seen for {address}")
+                    break
+        if latencies:
+            print(
+                f"{len(latencies)} of {args.moves} moved tokens alerted after p50 {statistics.median(latencies) * 1000:.0f}ms, "
+                f"max {max(latencies) * 1000:.0f}ms (stream interval {args.stream_interval}s)"
+            )
+
+        dropped = _server_call(base_url, f"/_drop_streams?refuse={args.outage}", "POST")["dropped"]
+        await _wait_until(lambda: planner.stream.live_tokens() == 0, 10)
+        fallback = await _sweep(planner, subscribers, base_url)
+        print(
+            f"dropped {dropped} sockets for {args.outage:g}s, sweep without the stream: {fallback['streamed']} streamed, "
+            f"{fallback['polled']} polled ({fallback['overview_calls']} overview calls, the rest still cached)"
+        )
+        reconnected = await _wait_until(lambda: planner.stream.live_tokens() == tokens, 30)
+        await asyncio.sleep(args.stream_interval * 2)
+        back = await _sweep(planner, subscribers, base_url)
+        print(f"resubscribed {reconnected:.2f}s after that sweep, then {back['streamed']} of {back['tokens']} tokens streamed")
+    finally:
+        if planner.stream is not None:
+            await planner.stream.stop()
+        await dm.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--moves", type=int, default=20)
+    parser.add_argument("--percent", type=float, default=40.0, help="how far a moved token's price jumps")
+    parser.add_argument("--threshold", type=float, default=20.0, help="every user's 1m threshold")
+    parser.add_argument("--stream-interval", type=float, default=0.5)
+    parser.add_argument("--outage", type=float, default=3.0, help="seconds the fake server refuses sockets after dropping them")
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    logger.setLevel(logging.WARNING)
+
+    config = FakeBirdeyeConfig(latency=0.01, jitter=0.0, wallets=args.users, hot_share=0.0, stream_interval=args.stream_interval, seed=args.seed)
+    server = start_in_process(config, port=args.port)
+    try:
+        asyncio.run(run(args, f"http://127.0.0.1:{args.port}"))
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
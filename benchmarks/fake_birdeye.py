@@ -0,0 +1,340 @@
+"""Local stand-in for the Birdeye endpoints DataManager calls, for offline benchmarks.
+
+Wallets, their portfolios and token prices are generated deterministically from a seed. Every request can be delayed,
+failed with a 500 or refused with a 429 once a requests-per-second budget is used up. ``GET /_stats`` returns request
+counts per endpoint and ``POST /_reset`` clears them.
+
+``/socket/solana`` stands in for Birdeye's price websocket: it takes SUBSCRIBE_PRICE/UNSUBSCRIBE_PRICE messages and
+sends a PRICE_DATA message per subscribed token every ``stream_interval`` seconds. ``POST /_move?address=...&percent=``
+moves a token's streamed price by that many percent, ``POST /_drop_streams?refuse=SECONDS`` closes every socket and
+refuses new ones for that long.
+
+Run standalone from the repository root and point ``DataManager(base_url=...)`` at it:
+
+    uv run python -m benchmarks.fake_birdeye --port 8765 --latency 0.05 --rate-limit 15
+"""
+
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Set
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import re
+import time
+import urllib.request
+
+from aiohttp import web
+
+from benchmarks.bench_overview_parsing import fake_value
+from src.sol_data.data_models import TokenOverviewResponse
+
+NO_MINT_OWNER = "11111111111111111111111111111111"
+BASE58 = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+
+@dataclass
+class FakeBirdeyeConfig:
+    latency: float = 0.05  # mean seconds per response
+    jitter: float = 0.02  # standard deviation of the latency
+    error_rate: float = 0.0  # share of requests answered with a 500
+    rate_limit: float = 0.0  # requests per second before answering 429, 0 for no limit
+    wallets: int = 1_000
+    tokens_per_wallet: int = 20
+    token_universe: int = 2_000
+    hot_share: float = 0.05  # share of tokens whose 5m change is big enough to alert on
+    stream_interval: float = 1.0  # seconds between streamed prices of a subscribed token
+    seed: int = 0
+
+
+def _address(kind: str, i: int, seed: int) -> str:
+    rng = random.Random(f"{kind}-{seed}-{i}")
+    return "".join(rng.choices(BASE58, k=44))
+
+
+def wallet_address(i: int, seed: int = 0) -> str:
+    return _address("wallet", i, seed)
+
+
+def token_address(i: int, seed: int = 0) -> str:
+    return _address("token", i, seed)
+
+
+class FakeBirdeye:
+    def __init__(self, config: FakeBirdeyeConfig) -> None:
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.tokens = [token_address(i, config.seed) for i in range(config.token_universe)]
+        self.token_index = {address: i for i, address in enumerate(self.tokens)}
+        self.wallet_index = {wallet_address(i, config.seed): i for i in range(config.wallets)}
+        # Popular tokens are held by many wallets, like in real portfolios
+        self._weights = [1 / (i + 1) for i in range(config.token_universe)]
+        self._overviews: Dict[str, Dict[str, Any]] = {}
+        self.counts: Dict[str, int] = {}
+        self.errors = 0
+        self.rate_limited = 0
+        self._tokens = config.rate_limit
+        self._refilled_at = time.monotonic()
+        self.moves: Dict[str, float] = {}  # percent added to a token's streamed price
+        self.sockets: Set[web.WebSocketResponse] = set()
+        self.streamed = 0
+        self.refuse_until = 0.0
+
+    def _portfolio(self, i: int) -> List[str]:
+        rng = random.Random(f"portfolio-{self.config.seed}-{i}")
+        picked = set(rng.choices(self.tokens, weights=self._weights, k=self.config.tokens_per_wallet * 2))
+        return sorted(picked)[: self.config.tokens_per_wallet]
+
+    def _price(self, address: str) -> Dict[str, float]:
+        rng = random.Random(f"price-{self.config.seed}-{address}")
+        price = rng.uniform(1e-6, 100)
+        hot = rng.random() < self.config.hot_share
+        change = rng.uniform(10, 80) if hot else rng.uniform(-5, 5)
+        trades = rng.randint(100, 5000) if hot else rng.randint(0, 50)
+        change_1m = change / 5 * rng.uniform(0.5, 1.5)
+        change_30m = change + rng.uniform(-10, 10)
+        change_1h = change_30m + rng.uniform(-10, 10)
+        return {
+            "price": price,
+            "history1mPrice": price / (1 + change_1m / 100),
+            "history5mPrice": price / (1 + change / 100),
+            "history30mPrice": price / (1 + change_30m / 100),
+            "history1hPrice": price / (1 + change_1h / 100),
+            "priceChange1mPercent": change_1m,
+            "priceChange5mPercent": change,
+            "priceChange30mPercent": change_30m,
+            "priceChange1hPercent": change_1h,
+            "trade5m": trades,
+            "uniqueWallet5m": trades // 4,
+            "liquidity": rng.uniform(1e3, 1e7),
+        }
+
+    def _overview(self, address: str) -> Dict[str, Any]:
+        overview = self._overviews.get(address)
+        if overview is None:
+            rng = random.Random(f"overview-{self.config.seed}-{address}")
+            overview = {name: fake_value(info.annotation, rng) for name, info in TokenOverviewResponse.model_fields.items()}
+            overview.update(self._price(address), address=address, symbol=f"TK{self.token_index[address]}", totalSupply=1e9)
+            overview["marketCap"] = overview["price"] * 1e9
+            self._overviews[address] = overview
+        return overview
+
+    def _take_token(self) -> bool:
+        if self.config.rate_limit <= 0:
+            return True
+        now = time.monotonic()
+        self._tokens = min(self.config.rate_limit, self._tokens + (now - self._refilled_at) * self.config.rate_limit)
+        self._refilled_at = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    @web.middleware
+    async def middleware(self, request: web.Request, handler):
+        if request.path.startswith("/_") or request.path.startswith("/socket/"):
+            return await handler(request)
+
+        self.counts[request.path] = self.counts.get(request.path, 0) + 1
+        if not self._take_token():
+            self.rate_limited += 1
+            return web.json_response({"success": False, "message": "Too many requests"}, status=429, headers={"Retry-After": "1"})
+
+        await asyncio.sleep(max(0.0, self.rng.gauss(self.config.latency, self.config.jitter)))
+        if self.rng.random() < self.config.error_rate:
+            self.errors += 1
+            return web.json_response({"success": False, "message": "Internal server error"}, status=500)
+        return await handler(request)
+
+    @staticmethod
+    def _ok(data: Any) -> web.Response:
+        return web.json_response({"success": True, "data": data})
+
+    async def wallet_token_list(self, request: web.Request) -> web.Response:
+        i = self.wallet_index.get(request.query.get("wallet", ""))
+        items = []
+        for address in self._portfolio(i) if i is not None else []:
+            overview = self._overview(address)
+            amount = random.Random(f"{i}-{address}").uniform(1, 1e6)
+            items.append(
+                {
+                    "address": address,
+                    "decimals": 6,
+                    "balance": int(amount * 1e6),
+                    "uiAmount": amount,
+                    "chainId": "solana",
+                    "name": overview["symbol"],
+                    "symbol": overview["symbol"],
+                    "priceUsd": overview["price"],
+                    "valueUsd": overview["price"] * amount,
+                }
+            )
+        return self._ok({"wallet": request.query.get("wallet"), "totalUsd": sum(item["valueUsd"] for item in items), "items": items})
+
+    async def token_overview(self, request: web.Request) -> web.Response:
+        address = request.query.get("address", "")
+        return self._ok(self._overview(address) if address in self.token_index else None)
+
+    async def multi_price(self, request: web.Request) -> web.Response:
+        now = int(time.time())
+        data = {}
+        for address in request.query.get("list_address", "").split(","):
+            if address in self.token_index:
+                price = self._price(address)
+                data[address] = {
+                    "value": price["price"],
+                    "updateUnixTime": now,
+                    "updateHumanTime": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(now)),
+                    "priceChange24h": price["priceChange5mPercent"],
+                    "liquidity": price["liquidity"],
+                }
+            else:
+                data[address] = None
+        return self._ok(data)
+
+    async def token_security(self, request: web.Request) -> web.Response:
+        address = request.query.get("address", "")
+        rng = random.Random(f"security-{address}")
+        return self._ok({"ownerOfOwnerAddress": NO_MINT_OWNER if rng.random() < 0.7 else address, "fakeToken": rng.random() < 0.05, "totalSupply": 1e9})
+
+    async def token_creation_info(self, request: web.Request) -> web.Response:
+        address = request.query.get("address", "")
+        block_time = 1_700_000_000 + random.Random(f"created-{address}").randrange(30_000_000)
+        return self._ok(
+            {
+                "txHash": _address("tx", self.token_index.get(address, 0), self.config.seed),
+                "slot": block_time // 2,
+                "tokenAddress": address,
+                "decimals": 6,
+                "owner": _address("owner", self.token_index.get(address, 0), self.config.seed),
+                "blockUnixTime": block_time,
+                "blockHumanTime": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(block_time)),
+            }
+        )
+
+    async def token_holders(self, request: web.Request) -> web.Response:
+        address = request.query.get("address", "")
+        limit = int(request.query.get("limit", 10))
+        rng = random.Random(f"holders-{address}")
+        amounts = sorted((rng.uniform(1e5, 5e7) for _ in range(limit)), reverse=True)
+        items = [
+            {"amount": str(int(amount * 1e6)), "decimals": 6, "mint": address, "owner": _address("holder", n, self.config.seed), "ui_amount": amount}
+            for n, amount in enumerate(amounts)
+        ]
+        return self._ok({"items": items})
+
+    async def _stream_prices(self, ws: web.WebSocketResponse, subscribed: Set[str]) -> None:
+        while not ws.closed:
+            await asyncio.sleep(self.config.stream_interval)
+            now = int(time.time())
+            for address in list(subscribed):
+                price = self._price(address)["price"] * (1 + self.moves.get(address, 0.0) / 100)
+                data = {"o": price, "h": price, "l": price, "c": price, "eventType": "ohlcv", "type": "1m", "unixTime": now - now % 60, "v": 1.0}
+                await ws.send_json({"type": "PRICE_DATA", "data": {**data, "symbol": f"TK{self.token_index[address]}", "address": address}})
+                self.streamed += 1
+
+    async def price_socket(self, request: web.Request) -> web.WebSocketResponse:
+        if time.monotonic() < self.refuse_until:
+            raise web.HTTPServiceUnavailable()
+        ws = web.WebSocketResponse(protocols=("echo-protocol",))
+        await ws.prepare(request)
+        self.sockets.add(ws)
+        subscribed: Set[str] = set()
+        sender = asyncio.create_task(self._stream_prices(ws, subscribed))
+        try:
+            await ws.send_json({"type": "WELCOME", "data": None})
+            async for message in ws:
+                try:
+                    payload = json.loads(message.data)
+                except (TypeError, ValueError):
+                    continue
+                if payload.get("type") == "SUBSCRIBE_PRICE":
+                    data = payload.get("data") or {}
+                    addresses = [data.get("address")] if data.get("queryType") == "simple" else re.findall(r"address = (\w+)", data.get("query", ""))
+                    subscribed.update(address for address in addresses if address in self.token_index)
+                elif payload.get("type") == "UNSUBSCRIBE_PRICE":
+                    subscribed.clear()
+        finally:
+            sender.cancel()
+            self.sockets.discard(ws)
+        return ws
+
+    async def move(self, request: web.Request) -> web.Response:
+        self.moves[request.query["address"]] = float(request.query.get("percent", 0))
+        return web.json_response({"success": True})
+
+    async def drop_streams(self, request: web.Request) -> web.Response:
+        self.refuse_until = time.monotonic() + float(request.query.get("refuse", 0))
+        sockets = list(self.sockets)
+        for ws in sockets:
+            await ws.close()
+        return web.json_response({"success": True, "dropped": len(sockets)})
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {"counts": self.counts, "errors": self.errors, "rate_limited": self.rate_limited, "stream_sockets": len(self.sockets), "streamed": self.streamed}
+        )
+
+    async def reset(self, request: web.Request) -> web.Response:
+        self.counts, self.errors, self.rate_limited = {}, 0, 0
+        return web.json_response({"success": True})
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self.middleware])
+        app.router.add_get("/v1/wallet/token_list", self.wallet_token_list)
+        app.router.add_get("/defi/token_overview", self.token_overview)
+        app.router.add_get("/defi/multi_price", self.multi_price)
+        app.router.add_get("/defi/token_security", self.token_security)
+        app.router.add_get("/defi/token_creation_info", self.token_creation_info)
+        app.router.add_get("/defi/v3/token/holder", self.token_holders)
+        app.router.add_get("/socket/solana", self.price_socket)
+        app.router.add_get("/_stats", self.stats)
+        app.router.add_post("/_reset", self.reset)
+        app.router.add_post("/_move", self.move)
+        app.router.add_post("/_drop_streams", self.drop_streams)
+        return app
+
+
+def serve(config: FakeBirdeyeConfig, host: str = "127.0.0.1", port: int = 8765) -> None:
+    web.run_app(FakeBirdeye(config).app(), host=host, port=port, print=None, access_log=None)
+
+
+def start_in_process(config: FakeBirdeyeConfig, host: str = "127.0.0.1", port: int = 8765, wait: float = 10.0) -> multiprocessing.Process:
+    """Serve from a child process, so the server's work does not show up in the benchmarked process"""
+    process = multiprocessing.get_context("spawn").Process(target=serve, args=(config, host, port), daemon=True)
+    process.start()
+    deadline = time.monotonic() + wait
+    while True:
+        try:
+            urllib.request.urlopen(f"http://{host}:{port}/_stats", timeout=1).close()
+            return process
+        except OSError:
+            if time.monotonic() > deadline or not process.is_alive():
+                process.terminate()
+                raise RuntimeError("Fake Birdeye server did not come up")
+            time.sleep(0.05)
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = FakeBirdeyeConfig()
+    for name, value in asdict(defaults).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+
+
+def config_from_args(args: argparse.Namespace) -> FakeBirdeyeConfig:
+    return FakeBirdeyeConfig(**{name: getattr(args, name) for name in asdict(FakeBirdeyeConfig())})
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+    print(f"Fake Birdeye on http://{args.host}:{args.port} with {json.dumps(asdict(config_from_args(args)))}")
+    serve(config_from_args(args), args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+from typing import List, Optional
+
+from src.alerts.planner import TokenAlert
+from src.sol_data.data_models import TokenOverviewResponse, WalletPortfolioItem
+from src.sol_data.price_history import DEFAULT_WINDOW
+
+
+def _fmt_usd(n):
+    try:
+        n = float(n)
+    except Exception:
+        return "-"
+    if n < 0:
+        sign, n = "-", -n
+    else:
+        sign = ""
+    if n >= 1_000_000_000:
+        return f"{sign}${n / 1_000_000_000:.2f}B"
+    if n >= 1_000_000:
+        return f"{sign}${n / 1_000_000:.2f}M"
+    if n >= 1_000:
+        return f"{sign}${n / 1_000:.2f}K"
+    return f"{sign}${n:,.2f}"
+
+
+def _fmt_price_with_zeroes(p):
+    try:
+        p = float(p)
+    except Exception:
+        return "-"
+    if p == 0:
+        return "$0.00"
+    if p >= 0.001:
+        s = f"${p:,.6f}".rstrip("0").rstrip(".")
+        return s
+    frac = f"{p:.18f}".split(".")[1].rstrip("0")
+    n0 = 0
+    for ch in frac:
+        if ch == "0":
+            n0 += 1
+        else:
+            break
+    tail = frac[n0 : n0 + 6] or "0"
+    return f"$0.0{{{n0}}}{tail}"
+
+
+def _yn(flag):
+    return "✅" if flag is True else ("❌" if flag is False else "—")
+
+
+def build_token_card(
+    token: WalletPortfolioItem,
+    token_overview: TokenOverviewResponse,
+    token_creation_time: str,
+    no_mint: Optional[bool] = None,
+    blacklist: Optional[bool] = None,
+    top_10_holders_str: str = None,
+    chain="Solana",
+    price_change: Optional[float] = None,
+    window: str = DEFAULT_WINDOW,
+):
+    liquidity = token_overview.liquidity
+    price = token_overview.price
+    token_symbol = token_overview.symbol or "Unknown"
+    market_cap = token_overview.marketCap
+    if price_change is None:
+        price_change = getattr(token_overview, f"priceChange{window}Percent") or 0.0
+
+    # Header
+    addr = token.address or "—"
+    header_left = f"${token_symbol} – {chain}"
+    header = f"{header_left}\n{addr}"
+
+    # Create
+    line_info_create = f"Creation Time: {token_creation_time}"
+
+    # MC, Liq, Price
+    line_info_mc = f"- MC: {_fmt_usd(market_cap)}"
+    line_info_liq = f"Liq: {_fmt_usd(liquidity)}"
+    line_info_px = f"Price: {_fmt_price_with_zeroes(price)} ({price_change:+.2f}%"
+    line_info_px += ")" if window == DEFAULT_WINDOW else f" {window})"
+
+    # Security
+    line_sec = f"NoMint {_yn(no_mint)} | Blacklist {_yn(blacklist)}"
+
+    card = (
+        f"""{header}
+
+📋 Info
+{line_info_create}
+{line_info_mc}
+{line_info_liq}
+{line_info_px}
+
+🛡️ Security
+{line_sec}
+
+💰 Top10 Holding
+{top_10_holders_str}
+"""
+    ).strip()
+
+    return card
+
+
+def build_token_cards(token_alerts: List[TokenAlert]) -> List[str]:
+    return [
+        build_token_card(
+            alert.token,
+            alert.enrichment.overview,
+            alert.enrichment.creation_time,
+            alert.enrichment.no_mint,
+            alert.enrichment.blacklist,
+            alert.enrichment.top_10_holder_str,
+            price_change=alert.change,
+            window=alert.window,
+        )
+        for alert in token_alerts
+    ]
@@ -0,0 +1,95 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import os
+import time
+
+from src.db.calls import db_call
+from src.db.database import DatabaseConnection
+
+AlertKey = Tuple[int, str]  # (discord_id, token_address)
+
+
+@dataclass(frozen=True)
+class Observation:
+    discord_id: int
+    token_address: str
+    change: float
+    threshold: float
+
+
+class AlertCooldown:
+    """Remembers which tokens a user was already alerted about so the sweep does not DM them every cycle.
+
+    After an alert, the same (user, token) pair is suppressed until at least ``cooldown`` seconds have passed and
+    the alert is re-armed, either because the change dropped below the user's threshold in between or because it
+    rose another ``rearm_step`` percentage points above the last alerted change. State lives in the ``alert_state``
+    table when a database is given, otherwise in memory.
+    """
+
+    def __init__(
+        self,
+        db: Optional[DatabaseConnection] = None,
+        cooldown: float = float(os.getenv("ALERT_COOLDOWN_SECONDS", 30 * 60)),
+        rearm_step: float = float(os.getenv("ALERT_REARM_STEP_PERCENT", 5.0)),
+    ) -> None:
+        self.db = db
+        self.cooldown = cooldown
+        self.rearm_step = rearm_step
+        self._memory: Dict[AlertKey, Dict[str, Any]] = {}
+
+    async def _load(self, discord_ids: Iterable[int]) -> Dict[AlertKey, Dict[str, Any]]:
+        if self.db is None:
+            return self._memory
+        return await db_call(self.db.get_alert_states, list(set(discord_ids)), default={}, source="Alert state")
+
+    async def _save(self, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        if self.db is None:
+            for row in rows:
+                self._memory[(row["discord_id"], row["token_address"])] = row
+            return
+        await db_call(self.db.upsert_alert_states, rows, source="Alert state")
+
+    def allows(self, state: Optional[Dict[str, Any]], change: float, now: float) -> bool:
+        if state is None:
+            return True
+        if now - state["last_alerted_at"] < self.cooldown:
+            return False
+        return state["armed"] or change >= state["last_change"] + self.rearm_step
+
+    async def evaluate(self, above: List[Observation], below: List[AlertKey]) -> Set[AlertKey]:
+        """Pairs from ``above`` (change at or over the threshold) that may be alerted now.
+
+        ``below`` are pairs seen under their threshold this cycle; they re-arm.
+        """
+        now = time.time()
+        states = await self._load([observation.discord_id for observation in above] + [discord_id for discord_id, _ in below])
+
+        rearmed = []
+        for key in below:
+            state = states.get(key)
+            if state is not None and not state["armed"]:
+                rearmed.append({**state, "armed": True})
+        await self._save(rearmed)
+
+        return {
+            (observation.discord_id, observation.token_address)
+            for observation in above
+            if self.allows(states.get((observation.discord_id, observation.token_address)), observation.change, now)
+        }
+
+    async def record(self, alerted: List[Observation]) -> None:
+        now = time.time()
+        await self._save(
+            [
+                {
+                    "discord_id": observation.discord_id,
+                    "token_address": observation.token_address,
+                    "last_alerted_at": now,
+                    "last_change": observation.change,
+                    "armed": False,
+                }
+                for observation in alerted
+            ]
+        )
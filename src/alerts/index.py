@@ -0,0 +1,131 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.sol_data.price_history import DEFAULT_WINDOW
+
+
+class SubscriptionIndex:
+    """Token address to the subscribers holding it, ordered by alert threshold.
+
+    Every token keeps, per change window its holders picked, two parallel arrays: the holders' thresholds in
+    ascending order and their discord ids. A price change over a window is then matched against all of those
+    holders with one bisect: everyone before ``bisect_right(thresholds, change)`` is at or over their threshold.
+    Arrays hold plain C doubles and int64s, no Python object per position.
+
+    The planner keeps holdings current after every wallet fetch, the registry passes on threshold and wallet changes
+    made through /setup; both only touch the tokens whose entries actually change.
+    """
+
+    def __init__(self) -> None:
+        self._thresholds: Dict[str, Dict[str, array]] = {}  # address -> window -> array("d"), ascending
+        self._holders: Dict[str, Dict[str, array]] = {}  # address -> window -> array("q"), discord ids in the same order
+        self._user_tokens: Dict[int, Tuple[str, ...]] = {}
+        self._user_threshold: Dict[int, float] = {}
+        self._user_window: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._thresholds)
+
+    def __contains__(self, address: str) -> bool:
+        return address in self._thresholds
+
+    @property
+    def users(self) -> int:
+        return len(self._user_tokens)
+
+    def tokens(self) -> Iterable[str]:
+        return self._thresholds.keys()
+
+    def _insert(self, address: str, window: str, discord_id: int, threshold: float) -> None:
+        windows = self._thresholds.setdefault(address, {})
+        thresholds = windows.get(window)
+        if thresholds is None:
+            windows[window] = array("d", [threshold])
+            self._holders.setdefault(address, {})[window] = array("q", [discord_id])
+            return
+        position = bisect_right(thresholds, threshold)
+        thresholds.insert(position, threshold)
+        self._holders[address][window].insert(position, discord_id)
+
+    def _remove(self, address: str, window: str, discord_id: int, threshold: float) -> None:
+        thresholds = self._thresholds.get(address, {}).get(window)
+        if thresholds is None:
+            return
+        holders = self._holders[address][window]
+        for position in range(bisect_left(thresholds, threshold), bisect_right(thresholds, threshold)):
+            if holders[position] == discord_id:
+                del thresholds[position]
+                del holders[position]
+                break
+        if not thresholds:
+            del self._thresholds[address][window]
+            del self._holders[address][window]
+            if not self._thresholds[address]:
+                del self._thresholds[address]
+                del self._holders[address]
+
+    def update(self, discord_id: int, threshold: float, tokens: Iterable[str], window: str = DEFAULT_WINDOW) -> None:
+        """Set the user's threshold, window and the tokens they hold, only changed entries are moved"""
+        new_tokens = tuple(dict.fromkeys(tokens))
+        old_tokens = self._user_tokens.get(discord_id, ())
+        old_threshold = self._user_threshold.get(discord_id)
+        old_window = self._user_window.get(discord_id)
+
+        if old_threshold == threshold and old_window == window:
+            kept = set(new_tokens)
+            removed = [address for address in old_tokens if address not in kept]
+            previous = set(old_tokens)
+            added = [address for address in new_tokens if address not in previous]
+        else:
+            removed, added = old_tokens, new_tokens
+
+        for address in removed:
+            self._remove(address, old_window, discord_id, old_threshold)
+        for address in added:
+            self._insert(address, window, discord_id, threshold)
+        self._user_tokens[discord_id] = new_tokens
+        self._user_threshold[discord_id] = threshold
+        self._user_window[discord_id] = window
+
+    def set_threshold(self, discord_id: int, threshold: float, window: Optional[str] = None) -> None:
+        """A new threshold, and optionally window, for a user, re-sorted into every token they are known to hold"""
+        if discord_id in self._user_tokens:
+            self.update(discord_id, threshold, self._user_tokens[discord_id], window or self._user_window[discord_id])
+
+    def remove(self, discord_id: int) -> None:
+        """Forget the user's holdings, e.g. after a wallet change, until their next wallet fetch"""
+        threshold = self._user_threshold.pop(discord_id, None)
+        window = self._user_window.pop(discord_id, None)
+        for address in self._user_tokens.pop(discord_id, ()):
+            self._remove(address, window, discord_id, threshold)
+
+    def threshold(self, discord_id: int) -> Optional[float]:
+        return self._user_threshold.get(discord_id)
+
+    def window(self, discord_id: int) -> Optional[str]:
+        return self._user_window.get(discord_id)
+
+    def windows(self, address: str) -> Iterable[str]:
+        """Change windows picked by the token's holders"""
+        return self._thresholds.get(address, {}).keys()
+
+    def min_thresholds(self, address: str) -> Dict[str, float]:
+        """Lowest threshold among the token's holders per window"""
+        return {window: thresholds[0] for window, thresholds in self._thresholds.get(address, {}).items()}
+
+    def min_threshold(self, address: str) -> Optional[float]:
+        """Lowest threshold among the token's holders, None if nobody holds it"""
+        return min(self.min_thresholds(address).values(), default=None)
+
+    def holders(self, address: str) -> List[int]:
+        return [discord_id for holders in self._holders.get(address, {}).values() for discord_id in holders]
+
+    def split(self, address: str, change: Optional[float], window: str = DEFAULT_WINDOW) -> Tuple[Sequence[int], Sequence[int]]:
+        """Holders watching ``window`` whose threshold ``change`` reaches, and the rest of them; an unknown change reaches none"""
+        thresholds = self._thresholds.get(address, {}).get(window)
+        if thresholds is None:
+            return (), ()
+        holders = self._holders[address][window]
+        position = 0 if change is None else bisect_right(thresholds, change)
+        return holders[:position], holders[position:]
@@ -0,0 +1,473 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+import os
+import time
+
+from src.discord.logger import logger
+from src.alerts.cooldown import AlertCooldown, Observation
+from src.alerts.index import SubscriptionIndex
+from src.alerts.polling import AdaptivePollScheduler
+from src.alerts.prefilter import PricePrefilter
+from src.db.database import DatabaseConnection
+from src.monitoring.metrics import metrics
+from src.sol_data.concurrency import gather_bounded
+from src.sol_data.data_manager import DataManager, DataManagerAPIError
+from src.sol_data.data_models import TokenCreationInfoResponse, TokenOverviewResponse, TokenSecurityResponse, WalletPortfolioItem
+from src.sol_data.metadata_store import TokenMetadataStore
+from src.sol_data.price_history import DEFAULT_WINDOW, WINDOWS, PriceHistory
+from src.sol_data.price_stream import PriceStream
+
+WRAPPED_TOKENS = {"SOL": "So11111111111111111111111111111111111111112", "ETH": "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"}
+
+NO_MINT_OWNER = "11111111111111111111111111111111"
+MISSING_TOP_10_HOLDERS = "-" + " | -" * 9
+
+# "sweep" cycles are the automatic ones, "interactive" ones are /alert checks
+ALERT_CYCLE_SECONDS = metrics.histogram("alert_cycle_seconds", "Duration of a planned alert cycle", ["mode"])
+ALERT_USERS_CHECKED = metrics.counter("alert_users_checked_total", "Users checked by alert cycles", ["mode"])
+ALERT_TOKENS_CHECKED = metrics.counter("alert_tokens_checked_total", "Unique tokens considered by alert cycles", ["mode"])
+ALERT_TOKENS_PREFILTERED = metrics.counter("alert_tokens_prefiltered_total", "Tokens dropped by the multi_price prefilter", ["mode"])
+ALERT_ALERTS = metrics.counter("alert_alerts_total", "Token alerts produced by alert cycles", ["mode"])
+ALERT_SUPPRESSED = metrics.counter("alert_suppressed_total", "Token alerts held back by the cooldown", ["mode"])
+ALERT_TOKENS_DEFERRED = metrics.counter("alert_tokens_deferred_total", "Tokens a sweep skipped because their next poll is not due", ["mode"])
+ALERT_TOKEN_POLLS = metrics.counter("alert_token_polls_total", "Due tokens checked between their holders' sweep slots", ["result"])
+ALERT_TOKENS_STREAMED = metrics.counter("alert_tokens_streamed_total", "Tokens a cycle matched from streamed prices without polling", ["mode"])
+ALERT_STREAM_CROSSINGS = metrics.counter("alert_stream_crossings_total", "Holders a streamed price took to their threshold")
+
+# Everything the alert path reads from a token overview: the threshold check, the price history, the token card and
+# the activity the adaptive poll interval is based on
+OVERVIEW_FIELDS = (
+    "symbol",
+    "price",
+    "history1mPrice",
+    "history5mPrice",
+    "history30mPrice",
+    "history1hPrice",
+    "priceChange1mPercent",
+    "priceChange5mPercent",
+    "priceChange30mPercent",
+    "priceChange1hPercent",
+    "trade5m",
+    "uniqueWallet5m",
+    "marketCap",
+    "liquidity",
+    "totalSupply",
+)
+
+
+@dataclass
+class Subscriber:
+    discord_id: int
+    wallet_address: str
+    threshold: float
+    window: str = DEFAULT_WINDOW  # a key of WINDOWS
+
+
+@dataclass
+class TokenEnrichment:
+    """Everything a token card needs, fetched once per token and shared by all of its holders"""
+
+    overview: TokenOverviewResponse  # a projection carrying OVERVIEW_FIELDS
+    creation_time: str = "-"
+    no_mint: Optional[bool] = None
+    blacklist: Optional[bool] = None
+    top_10_holder_str: str = MISSING_TOP_10_HOLDERS
+
+
+@dataclass
+class TokenAlert:
+    token: WalletPortfolioItem
+    enrichment: TokenEnrichment
+    change: Optional[float] = None  # percent over ``window``, what the holder's threshold was checked against
+    window: str = DEFAULT_WINDOW
+
+
+@dataclass
+class CycleStats:
+    subscribers: int = 0
+    token_positions: int = 0
+    unique_tokens: int = 0
+    deferred_tokens: int = 0
+    streamed_tokens: int = 0
+    prefiltered_tokens: int = 0
+    suppressed_alerts: int = 0
+    enriched_tokens: int = 0
+    alerts: int = 0
+    seconds: float = 0.0
+
+
+@dataclass
+class AlertCyclePlanner:
+    """Plans one alert cycle across many subscribers.
+
+    Wallets are fetched per subscriber, but every token address is looked up and enriched only once
+    per cycle no matter how many subscribers hold it. The results are then fanned out to each holder.
+    Each stage runs with at most ``max_concurrency`` requests in flight. Holdings and thresholds are kept in
+    ``index`` across cycles, so matching a token's price change against its holders is one bisect per window.
+
+    Every fetched price lands in ``history``, shared with the prefilter, and changes over the holders' windows are
+    computed from it; Birdeye's own ``priceChange*Percent`` is only used while the history has no sample old enough.
+
+    With a ``poller``, sweeps only fetch overviews of tokens whose adaptive poll interval ran out, and
+    ``poll_due_tokens`` checks such tokens between their holders' sweep slots.
+
+    With a ``stream``, held tokens are subscribed to the Birdeye price stream after every cycle. Streamed prices go
+    into ``history`` and are matched against the index as they arrive; ``early_holders`` hands out whoever they took
+    to their threshold. Cycles match live tokens from the history without polling them and only fetch an overview
+    once a holder is alerted, for the card. Tokens whose stream is down are polled as usual.
+    """
+
+    dm: DataManager
+    metadata_store: Optional[TokenMetadataStore] = None
+    prefilter: Optional[PricePrefilter] = None
+    cooldown: Optional[AlertCooldown] = None
+    poller: Optional[AdaptivePollScheduler] = None
+    max_concurrency: int = int(os.getenv("ALERT_MAX_CONCURRENCY", 10))
+    index: SubscriptionIndex = field(default_factory=SubscriptionIndex)
+    history: Optional[PriceHistory] = None
+    stream: Optional[PriceStream] = None
+    last_stats: CycleStats = field(default_factory=CycleStats)
+
+    def __post_init__(self) -> None:
+        if self.metadata_store is None:
+            self.metadata_store = TokenMetadataStore(self.dm, max_concurrency=self.max_concurrency)
+        if self.history is None:
+            self.history = self.prefilter.history if self.prefilter is not None else PriceHistory()
+        self._crossings: Dict[Tuple[int, str], Observation] = {}
+        self._crossed = asyncio.Event()
+
+    async def run(self, subscribers: List[Subscriber], apply_cooldown: bool = True) -> Dict[int, List[TokenAlert]]:
+        """Alerts per discord id. ``apply_cooldown=False`` reports everything over the threshold, e.g. for /alert"""
+        started = time.perf_counter()
+        stats = CycleStats(subscribers=len(subscribers))
+        holdings = await self._collect_holdings(subscribers)
+        stats.token_positions = sum(len(tokens) for tokens in holdings.values())
+
+        # Lowest threshold per window of anyone holding a token decides whether it is worth a full overview
+        min_threshold: Dict[str, Dict[str, float]] = {}
+        for subscriber in subscribers:
+            tokens = holdings.get(subscriber.discord_id)
+            if tokens is None:
+                continue  # wallet fetch failed, the index keeps the last known holdings
+            self.index.update(subscriber.discord_id, subscriber.threshold, (token.address for token in tokens), subscriber.window)
+            for token in tokens:
+                windows = min_threshold.setdefault(token.address, {})
+                current = windows.get(subscriber.window)
+                if current is None or subscriber.threshold < current:
+                    windows[subscriber.window] = subscriber.threshold
+        stats.unique_tokens = len(min_threshold)
+
+        # Streamed tokens are matched from the price history as is, only the rest is polled
+        live = self._live_changes(min_threshold)
+        stats.streamed_tokens = len(live)
+        unstreamed = {address: thresholds for address, thresholds in min_threshold.items() if address not in live}
+
+        # Sweeps leave tokens alone until their poll is due, /alert always looks at everything. Only due tokens get a
+        # new poll time, the others were polled a moment ago and come from the cache.
+        polled, due = unstreamed, unstreamed
+        if self.poller is not None:
+            now = time.time()
+            due = {address: threshold for address, threshold in unstreamed.items() if self.poller.is_due(address, now)}
+            if apply_cooldown:
+                polled = {address: threshold for address, threshold in unstreamed.items() if self.poller.should_fetch(address, now)}
+        stats.deferred_tokens = len(unstreamed) - len(polled)
+
+        addresses, rejected = list(polled), set()
+        if self.prefilter is not None:
+            addresses, rejected = await self.prefilter.partition(polled)
+        stats.prefiltered_tokens = len(polled) - len(addresses)
+        overviews = await self._get_overviews(addresses)
+        self._schedule_polls(due, overviews)
+
+        # Match every holder against their own threshold before spending any enrichment calls. The index also holds
+        # users outside this cycle, e.g. during a single user's /alert check, so matches are limited to ours.
+        checked = {subscriber.discord_id for subscriber in subscribers if subscriber.discord_id in holdings}
+        above: List[Observation] = []
+        below = []
+
+        def match(address: str, window: str, change: Optional[float]) -> None:
+            if change is None:
+                return  # nothing known about this window, its holders are neither alerted nor re-armed
+            matched, unmatched = self.index.split(address, change, window)
+            above.extend(
+                Observation(discord_id, address, change, self.index.threshold(discord_id)) for discord_id in matched if discord_id in checked
+            )
+            below.extend((discord_id, address) for discord_id in unmatched if discord_id in checked)
+
+        for address, changes in live.items():
+            for window, change in changes.items():
+                match(address, window, change)
+        for address in polled:
+            overview = overviews.get(address)
+            if overview is not None:
+                for window, change in self.window_changes(address, overview).items():
+                    match(address, window, change)
+            elif address in rejected:
+                # The prefilter compared its price with a reference, clearly under every holder's threshold. Tokens it
+                # could not price, like failed overviews, count neither way.
+                below += [(discord_id, address) for discord_id in self.index.holders(address) if discord_id in checked]
+
+        if self.cooldown is not None and apply_cooldown:
+            allowed = await self.cooldown.evaluate(above, below)
+            stats.suppressed_alerts = len(above) - len(allowed)
+            above = [observation for observation in above if (observation.discord_id, observation.token_address) in allowed]
+
+        to_enrich = list(dict.fromkeys(observation.token_address for observation in above))
+        missing = [address for address in to_enrich if address not in overviews]
+        if missing:
+            # Streamed tokens get their overview only now, for the card; the stream's prices are newer than its price
+            overviews.update(await self._get_overviews(missing, record=False))
+            above = [observation for observation in above if observation.token_address in overviews]
+            to_enrich = [address for address in to_enrich if address in overviews]
+
+        # Creation info, security and top holders of every token are all requested at the same time
+        creation_infos, securities, top_holders = await asyncio.gather(
+            self.metadata_store.get_creation_infos(to_enrich),
+            self.metadata_store.get_securities(to_enrich),
+            gather_bounded(lambda address: self._get_top_holders(address, overviews[address]), to_enrich, self.max_concurrency),
+        )
+
+        enrichments: Dict[str, TokenEnrichment] = {}
+        for address, top_10_holder_str in zip(to_enrich, top_holders):
+            if isinstance(top_10_holder_str, BaseException):
+                logger.error(f"Failed to fetch top 10 token holders! {top_10_holder_str!r}")
+                top_10_holder_str = MISSING_TOP_10_HOLDERS
+            enrichments[address] = self.enrich(
+                overviews[address], creation_infos.get(address), securities.get(address), top_10_holder_str
+            )
+        stats.enriched_tokens = len(enrichments)
+
+        alerting = {(observation.discord_id, observation.token_address): observation.change for observation in above}
+        alerts: Dict[int, List[TokenAlert]] = {}
+        for subscriber in subscribers:
+            user_alerts = []
+            for token in holdings.get(subscriber.discord_id, []):
+                change = alerting.get((subscriber.discord_id, token.address))
+                if change is not None:
+                    user_alerts.append(TokenAlert(token, enrichments[token.address], change, subscriber.window))
+            alerts[subscriber.discord_id] = user_alerts
+            stats.alerts += len(user_alerts)
+
+        if self.cooldown is not None and apply_cooldown:
+            await self.cooldown.record(above)
+        if self.stream is not None:
+            self.stream.update(self.index.tokens())
+
+        stats.seconds = time.perf_counter() - started
+        self.last_stats = stats
+        self._record_metrics(stats, "sweep" if apply_cooldown else "interactive")
+        logger.info(
+            f"Planned cycle for {stats.subscribers} users: {stats.token_positions} token positions, "
+            f"{stats.unique_tokens} unique tokens, {stats.deferred_tokens} not due, {stats.streamed_tokens} streamed, "
+            f"{stats.prefiltered_tokens} prefiltered, {stats.suppressed_alerts} suppressed, {stats.enriched_tokens} enriched, {stats.alerts} alerts"
+        )
+        return alerts
+
+    async def poll_due_tokens(self) -> Set[int]:
+        """Fetch the overviews of held tokens whose poll is due before their holders' next sweep slot.
+
+        Returns the holders now at or over their threshold whose alert the cooldown allows; running the planner for
+        them produces the alerts, with the overviews still cached.
+        """
+        if self.poller is None:
+            return set()
+
+        due = [address for address in self.poller.due(self.index.tokens()) if self.stream is None or not self.stream.live(address)]
+        if not due:
+            return set()
+
+        min_threshold = {address: self.index.min_thresholds(address) for address in due}
+        addresses = await self.prefilter.candidates(min_threshold) if self.prefilter is not None else due
+        overviews = await self._get_overviews(addresses)
+        self._schedule_polls(min_threshold, overviews)
+
+        above: List[Observation] = []
+        for address, overview in overviews.items():
+            for window, change in self.window_changes(address, overview).items():
+                matched, _ = self.index.split(address, change, window)
+                above += [Observation(discord_id, address, change, self.index.threshold(discord_id)) for discord_id in matched]
+        if self.cooldown is not None and above:
+            allowed = await self.cooldown.evaluate(above, [])
+            above = [observation for observation in above if (observation.discord_id, observation.token_address) in allowed]
+
+        holders = {observation.discord_id for observation in above}
+        ALERT_TOKEN_POLLS.inc(len(due) - len(overviews), result="quiet")
+        ALERT_TOKEN_POLLS.inc(len(overviews), result="fetched")
+        logger.info(f"Polled {len(overviews)} of {len(due)} due tokens, {len(holders)} holders to check now")
+        return holders
+
+    def observe_price(self, address: str, price: float, at: float) -> None:
+        """Stream callback: record the price and note every holder it takes to their threshold"""
+        self.history.record(address, price, at)
+        for window in list(self.index.windows(address)):
+            change = self.history.change_since(address, WINDOWS[window], at)
+            matched, _ = self.index.split(address, change, window)
+            for discord_id in matched:
+                self._crossings[discord_id, address] = Observation(discord_id, address, change, self.index.threshold(discord_id))
+        if self._crossings:
+            self._crossed.set()
+
+    async def wait_for_crossing(self, timeout: float) -> None:
+        """Sleep for ``timeout`` seconds, or until a streamed price takes a holder to their threshold"""
+        try:
+            await asyncio.wait_for(self._crossed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def streamed_holders(self) -> Set[int]:
+        """Holders streamed prices took to their threshold since the last call, as far as the cooldown allows"""
+        above = list(self._crossings.values())
+        self._crossings.clear()
+        self._crossed.clear()
+        if self.cooldown is not None and above:
+            allowed = await self.cooldown.evaluate(above, [])
+            above = [observation for observation in above if (observation.discord_id, observation.token_address) in allowed]
+        ALERT_STREAM_CROSSINGS.inc(len(above))
+        return {observation.discord_id for observation in above}
+
+    async def early_holders(self) -> Set[int]:
+        """Holders to check ahead of their sweep slot, from the stream and from polls of due tokens"""
+        return await self.streamed_holders() | await self.poll_due_tokens()
+
+    def _live_changes(self, min_threshold: Dict[str, Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+        """Changes per window of the tokens the stream keeps current and the history reaches far enough back for"""
+        if self.stream is None:
+            return {}
+        now = time.time()
+        live = {}
+        for address in min_threshold:
+            if self.stream.live(address):
+                changes = {window: self.history.change_since(address, WINDOWS[window], now) for window in self.index.windows(address)}
+                if None not in changes.values():
+                    live[address] = changes
+        return live
+
+    async def _get_overviews(self, addresses: List[str], record: bool = True) -> Dict[str, TokenOverviewResponse]:
+        """Overviews by address. Recorded ones go into the history first, and a token is left out when none of the
+        windows its holders watch has a change from either source"""
+        overviews: Dict[str, TokenOverviewResponse] = {}
+        for address, overview in zip(addresses, await gather_bounded(self._get_overview, addresses, self.max_concurrency)):
+            if isinstance(overview, BaseException):
+                logger.error(f"Failed to process token overview for {address}: {overview!r}")
+            elif overview is not None:
+                if record:
+                    self.history.observe_overview(address, overview)
+                    changes = self.window_changes(address, overview)
+                    if changes and all(change is None for change in changes.values()):
+                        logger.info(f"Price change over {', '.join(changes)} is not available for {address}")
+                        continue
+                overviews[address] = overview
+        return overviews
+
+    def window_change(self, address: str, overview: TokenOverviewResponse, window: str) -> Optional[float]:
+        """Percent change over ``window`` from the local price history, Birdeye's own figure until it covers the window"""
+        change = self.history.change(address, WINDOWS[window])
+        if change is None:
+            change = getattr(overview, f"priceChange{window}Percent")
+        return change
+
+    def window_changes(self, address: str, overview: TokenOverviewResponse, windows: Optional[Iterable[str]] = None) -> Dict[str, Optional[float]]:
+        """``window_change`` for every window the token's holders watch, or for ``windows``"""
+        windows = self.index.windows(address) if windows is None else windows
+        return {window: self.window_change(address, overview, window) for window in list(windows)}
+
+    def _schedule_polls(self, min_threshold: Dict[str, Dict[str, float]], overviews: Dict[str, TokenOverviewResponse]) -> None:
+        if self.poller is None:
+            return
+        now = time.time()
+        for address, thresholds in min_threshold.items():
+            overview = overviews.get(address)
+            if overview is None:
+                self.poller.defer(address, now)
+            else:
+                # Holders outside this cycle count too, the index knows the lowest threshold of all of them per window
+                thresholds = self.index.min_thresholds(address) or thresholds
+                self.poller.observe(address, overview, thresholds, self.window_changes(address, overview, thresholds), now)
+
+    @staticmethod
+    def _record_metrics(stats: CycleStats, mode: str) -> None:
+        ALERT_CYCLE_SECONDS.observe(stats.seconds, mode=mode)
+        ALERT_USERS_CHECKED.inc(stats.subscribers, mode=mode)
+        ALERT_TOKENS_CHECKED.inc(stats.unique_tokens, mode=mode)
+        ALERT_TOKENS_DEFERRED.inc(stats.deferred_tokens, mode=mode)
+        ALERT_TOKENS_STREAMED.inc(stats.streamed_tokens, mode=mode)
+        ALERT_TOKENS_PREFILTERED.inc(stats.prefiltered_tokens, mode=mode)
+        ALERT_ALERTS.inc(stats.alerts, mode=mode)
+        ALERT_SUPPRESSED.inc(stats.suppressed_alerts, mode=mode)
+
+    async def _collect_holdings(self, subscribers: List[Subscriber]) -> Dict[int, List[WalletPortfolioItem]]:
+        results = await gather_bounded(lambda subscriber: self.dm.get_wallet_portfolio(subscriber.wallet_address), subscribers, self.max_concurrency)
+
+        holdings: Dict[int, List[WalletPortfolioItem]] = {}
+        for subscriber, portfolio in zip(subscribers, results):
+            if isinstance(portfolio, BaseException):
+                logger.error(f"Failed to fetch wallet portfolio for user {subscriber.discord_id}: {portfolio!r}")
+                continue
+
+            tokens = portfolio.items
+            if not tokens:
+                logger.info(f"No tokens found in wallet {subscriber.wallet_address}")
+                holdings[subscriber.discord_id] = []
+                continue
+
+            for token in tokens:
+                if token.name in WRAPPED_TOKENS:
+                    token.address = WRAPPED_TOKENS[token.name]
+            holdings[subscriber.discord_id] = [token for token in tokens if token.address]
+        return holdings
+
+    async def _get_overview(self, address: str) -> Optional[TokenOverviewResponse]:
+        logger.debug(f"Processing token: {address}")
+        try:
+            token_overview = await self.dm.get_token_overview(address, fields=OVERVIEW_FIELDS)
+        except DataManagerAPIError:
+            logger.error("Failed to fetch token overview!")
+            return None
+        return token_overview
+
+    async def _get_top_holders(self, address: str, overview: TokenOverviewResponse) -> str:
+        total_supply = overview.totalSupply
+        try:
+            top_holders = await self.dm.get_token_holders(address)
+            top_10_holder_str = ""
+            for holder in top_holders.items:
+                top_10_holder_str += f" {holder.ui_amount / total_supply * 100:.2f}%" + " | "
+            return top_10_holder_str
+        except (DataManagerAPIError, TypeError, ZeroDivisionError):
+            logger.error("Failed to fetch top 10 token holders!")
+            return MISSING_TOP_10_HOLDERS
+
+    @staticmethod
+    def enrich(
+        overview: TokenOverviewResponse,
+        creation_info: Optional[TokenCreationInfoResponse],
+        security: Optional[TokenSecurityResponse],
+        top_10_holder_str: str = MISSING_TOP_10_HOLDERS,
+    ) -> TokenEnrichment:
+        """Combine fetched data into an enrichment, anything missing keeps the card fallbacks"""
+        enrichment = TokenEnrichment(overview=overview, top_10_holder_str=top_10_holder_str)
+
+        if creation_info is not None:
+            enrichment.creation_time = creation_info.blockHumanTime
+
+        if security is not None:
+            enrichment.no_mint = security.ownerOfOwnerAddress == NO_MINT_OWNER
+            enrichment.blacklist = security.fakeToken
+
+        return enrichment
+
+
+def create_planner(dm: DataManager, db: Optional[DatabaseConnection] = None) -> AlertCyclePlanner:
+    """Planner wired the way the bot and the workers run it"""
+    prefilter = PricePrefilter(dm) if os.getenv("PREFILTER_ENABLED", "true").lower() == "true" else None
+    cooldown = AlertCooldown(db) if os.getenv("ALERT_COOLDOWN_ENABLED", "true").lower() == "true" else None
+    poller = None
+    if os.getenv("ADAPTIVE_POLLING_ENABLED", "true").lower() == "true":
+        overview_cache = dm.caches.get("/defi/token_overview")
+        # Without an overview cache every poll is a real call
+        poller = AdaptivePollScheduler(cache_ttl=overview_cache.ttl if overview_cache is not None else 0.0)
+    planner = AlertCyclePlanner(dm, TokenMetadataStore(dm, db), prefilter, cooldown, poller)
+    if os.getenv("PRICE_STREAM_ENABLED", "false").lower() == "true":
+        planner.stream = PriceStream(planner.observe_price)
+    return planner
@@ -0,0 +1,117 @@
+from typing import Dict, Iterable, List, Optional
+import os
+import time
+
+from src.discord.logger import logger
+from src.monitoring.metrics import metrics
+from src.sol_data.data_manager import DEFAULT_CACHE_POLICIES
+from src.sol_data.data_models import TokenOverviewResponse
+
+ALERT_TOKEN_POLL_INTERVAL = metrics.histogram(
+    "alert_token_poll_interval_seconds", "Overview poll interval chosen per token", buckets=(30, 60, 120, 180, 300, 450, 600, 900, 1200, 1800, 3600)
+)
+
+
+class AdaptivePollScheduler:
+    """Decides per token when its overview is worth fetching again.
+
+    The gap to a threshold is the lowest holder threshold of a window minus the token's change over that window, and
+    the token is scheduled by its smallest gap over the windows its holders watch. A token at or over a threshold is
+    polled every ``min_interval``. Otherwise the gap is divided by the current pace of the price
+    (``priceChange1mPercent``, in percent per minute) to estimate when the change could reach it, and the token is
+    polled twice within that time, but at least every ``base_interval``. Windows without a known change are left
+    out, a token with none at all is polled every ``base_interval``. Quiet tokens, with fewer than ``quiet_trades``
+    trades and ``quiet_wallets`` unique wallets in the last 5 minutes, wait twice as long, up to ``max_interval``.
+    Tokens never polled, or only seen through the prefilter, are due every ``base_interval`` like before.
+
+    Polls go through the overview cache, so a poll sooner than ``cache_ttl`` after the last one would be answered
+    from the cache; ``min_interval`` is raised to ``cache_ttl`` when it is shorter.
+    """
+
+    def __init__(
+        self,
+        base_interval: float = float(os.getenv("SWEEP_INTERVAL_SECONDS", 5 * 60)),
+        min_interval: float = float(os.getenv("POLL_MIN_SECONDS", 60)),
+        max_interval: float = float(os.getenv("POLL_MAX_SECONDS", 15 * 60)),
+        quiet_trades: int = int(os.getenv("POLL_QUIET_TRADES", 10)),
+        quiet_wallets: int = int(os.getenv("POLL_QUIET_WALLETS", 5)),
+        min_pace: float = 0.1,
+        cache_ttl: Optional[float] = DEFAULT_CACHE_POLICIES["/defi/token_overview"].ttl,
+    ) -> None:
+        if cache_ttl is None:
+            logger.warning("The token overview cache never expires, adaptive polls will be answered from the cache")
+            cache_ttl = min_interval
+        elif cache_ttl > min_interval:
+            logger.warning(f"POLL_MIN_SECONDS={min_interval:g} is shorter than BIRDEYE_OVERVIEW_TTL={cache_ttl:g}, polling no sooner than that")
+            min_interval = cache_ttl
+        self.base_interval = max(base_interval, min_interval)
+        self.min_interval = min_interval
+        # An overview fetched less than this long ago is still in the cache
+        self.cache_ttl = cache_ttl
+        self.max_interval = max_interval
+        self.quiet_trades = quiet_trades
+        self.quiet_wallets = quiet_wallets
+        # A flat 1m change still counts as this many percent per minute, so the estimate stays finite
+        self.min_pace = min_pace
+        self._next_due: Dict[str, float] = {}
+        self._polled_at: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._next_due)
+
+    def interval(self, overview: TokenOverviewResponse, min_thresholds: Dict[str, float], changes: Dict[str, Optional[float]]) -> float:
+        """``min_thresholds`` and ``changes`` are keyed by window"""
+        distances = [threshold - changes[window] for window, threshold in min_thresholds.items() if changes.get(window) is not None]
+        if not distances:
+            return self.base_interval
+
+        distance = min(distances)
+        if distance <= 0:
+            return self.min_interval
+
+        pace = max(abs(overview.priceChange1mPercent or 0.0), self.min_pace)
+        interval = min(self.base_interval, max(self.min_interval, distance / pace * 60 / 2))
+        if (overview.trade5m or 0) < self.quiet_trades and (overview.uniqueWallet5m or 0) < self.quiet_wallets:
+            interval = min(self.max_interval, interval * 2)
+        return interval
+
+    def observe(
+        self,
+        address: str,
+        overview: TokenOverviewResponse,
+        min_thresholds: Dict[str, float],
+        changes: Dict[str, Optional[float]],
+        now: Optional[float] = None,
+    ) -> float:
+        """Schedule the next poll from a freshly fetched overview and the token's changes per window, returns the interval"""
+        now = time.time() if now is None else now
+        interval = self.interval(overview, min_thresholds, changes)
+        self._polled_at[address] = now
+        self._next_due[address] = now + interval
+        ALERT_TOKEN_POLL_INTERVAL.observe(interval)
+        return interval
+
+    def defer(self, address: str, now: Optional[float] = None) -> None:
+        """No overview this time (dropped by the prefilter or failed), check again after ``base_interval``"""
+        now = time.time() if now is None else now
+        self._next_due[address] = now + self.base_interval
+
+    def is_due(self, address: str, now: float) -> bool:
+        next_due = self._next_due.get(address)
+        return next_due is None or next_due <= now
+
+    def should_fetch(self, address: str, now: float) -> bool:
+        """Due, or polled so recently that the overview is still cached and costs no call"""
+        polled_at = self._polled_at.get(address)
+        return self.is_due(address, now) or (polled_at is not None and now - polled_at < self.cache_ttl)
+
+    def due(self, addresses: Iterable[str], now: Optional[float] = None) -> List[str]:
+        """Addresses whose poll time has come. Tokens never scheduled are left to their holders' sweep slots, tokens
+        no longer in ``addresses`` are forgotten."""
+        now = time.time() if now is None else now
+        addresses = list(addresses)
+        held = set(addresses)
+        for address in [address for address in self._next_due if address not in held]:
+            del self._next_due[address]
+            self._polled_at.pop(address, None)
+        return [address for address in addresses if address in self._next_due and self._next_due[address] <= now]
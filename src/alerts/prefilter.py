@@ -0,0 +1,77 @@
+from typing import Dict, List, Optional, Set, Tuple
+import os
+import time
+
+from src.discord.logger import logger
+from src.sol_data.data_manager import DataManager, DataManagerAPIError
+from src.sol_data.price_history import WINDOWS, PriceHistory
+
+
+class PricePrefilter:
+    """Cheap first pass over a cycle's tokens using the batched multi_price endpoint.
+
+    One multi_price request prices up to 100 tokens. For every change window the token's holders picked, the
+    current price is compared with a sample from roughly that long ago in ``history`` (kept from earlier cycles, or
+    seeded from an overview's history prices). Tokens whose local change is clearly below the lowest threshold of
+    their holders in every window, and tokens Birdeye cannot price at all, are dropped before the expensive overview
+    and enrichment calls. A window without a usable reference keeps the token a candidate.
+    """
+
+    def __init__(
+        self,
+        dm: DataManager,
+        history: Optional[PriceHistory] = None,
+        slack: float = float(os.getenv("PREFILTER_SLACK_PERCENT", 2.0)),
+        min_liquidity: float = float(os.getenv("PREFILTER_MIN_LIQUIDITY", 0)),
+    ) -> None:
+        self.dm = dm
+        self.history = PriceHistory() if history is None else history
+        self.slack = slack
+        self.min_liquidity = min_liquidity
+
+    def _might_alert(self, address: str, price: float, min_thresholds: Dict[str, float], now: float) -> bool:
+        for window, threshold in min_thresholds.items():
+            seconds = WINDOWS[window]
+            reference = self.history.reference(address, now - seconds, tolerance=seconds / 2)
+            if reference is None or (price - reference) / reference * 100 >= threshold - self.slack:
+                return True
+        return False
+
+    async def candidates(self, min_thresholds: Dict[str, Dict[str, float]]) -> List[str]:
+        """Addresses from ``min_thresholds`` (lowest threshold per window) that might meet one and deserve a full overview"""
+        candidates, _ = await self.partition(min_thresholds)
+        return candidates
+
+    async def partition(self, min_thresholds: Dict[str, Dict[str, float]]) -> Tuple[List[str], Set[str]]:
+        """``candidates``, and the dropped addresses whose price was compared with a reference and fell short in every
+        window. Tokens dropped without a price or for low liquidity are in neither, nothing is known about their change."""
+        addresses = list(min_thresholds)
+        if not addresses:
+            return [], set()
+
+        try:
+            prices = (await self.dm.get_multi_price(addresses)).root
+        except DataManagerAPIError as e:
+            logger.error(f"Price prefilter unavailable, checking every token: {e}")
+            return addresses, set()
+
+        now = time.time()
+        candidates = []
+        below: Set[str] = set()
+        for address in addresses:
+            price = prices.get(address)
+            if price is None or price.value <= 0:
+                continue
+            if self.min_liquidity and price.liquidity is not None and price.liquidity < self.min_liquidity:
+                continue
+
+            # References are looked up before the new sample can replace one in the same bucket
+            keep = self._might_alert(address, price.value, min_thresholds[address], now)
+            self.history.record(address, price.value, price.updateUnixTime or now)
+            if keep:
+                candidates.append(address)
+            else:
+                below.add(address)
+
+        logger.info(f"Price prefilter kept {len(candidates)} of {len(addresses)} tokens, {len(below)} clearly under their thresholds")
+        return candidates, below
@@ -0,0 +1,155 @@
+from contextlib import aclosing
+from typing import Dict, Iterable, List, Optional
+import os
+import time
+
+from src.alerts.index import SubscriptionIndex
+from src.alerts.planner import Subscriber
+from src.db.database import AsyncDatabaseConnection
+from src.discord.logger import logger
+from src.sol_data.price_history import DEFAULT_WINDOW
+
+
+class SubscriberRegistry:
+    """In-process copy of every user's wallet address, threshold and change window.
+
+    The initial load streams users in ``discord_id`` order, a page at a time, and can be spread over several
+    ``refresh`` calls with a time budget: the sweep works with the users loaded so far, and a load that ran out of
+    time or failed resumes after the last ``discord_id`` it stored. Once loaded, the registry is kept current
+    write-through by ``upsert_wallet`` and ``upsert_price_watch`` and by ``refresh``, which only fetches users whose
+    ``updated_at`` moved past the newest change seen so far. That keeps processes sharing the database in sync
+    without re-running the full join. Reads never touch the database.
+
+    Wallet, threshold and window changes are passed on to the planner's ``index`` when one is given.
+    """
+
+    def __init__(
+        self,
+        db: AsyncDatabaseConnection,
+        refresh_interval: float = float(os.getenv("SUBSCRIBER_REFRESH_SECONDS", 30)),
+        page_size: int = int(os.getenv("SUBSCRIBER_PAGE_SIZE", 1000)),
+        clock_skew: float = 5.0,
+        index: Optional[SubscriptionIndex] = None,
+    ) -> None:
+        self.db = db
+        self.refresh_interval = refresh_interval
+        self.page_size = page_size
+        # Changes are re-read this far behind the newest timestamp, rows written by hosts with a lagging clock still show up
+        self.clock_skew = clock_skew
+        self.index = index
+        self._wallets: Dict[int, str] = {}
+        self._thresholds: Dict[int, float] = {}
+        self._windows: Dict[int, str] = {}
+        self._load_cursor: Optional[int] = None  # last discord_id stored by the initial load
+        self._load_started: Optional[float] = None
+        self._high_water: Optional[float] = None  # set once the initial load finished
+        self._refreshed_at = 0.0
+        self._subscribers: Optional[List[Subscriber]] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._high_water is not None
+
+    async def load(self) -> None:
+        """Load, or finish loading, every subscriber"""
+        await self._load_pages(deadline=None)
+
+    async def _load_pages(self, deadline: Optional[float]) -> None:
+        if self._load_started is None:
+            self._load_started = time.time()
+
+        async with aclosing(self.db.stream_users_with_settings(after=self._load_cursor, page_size=self.page_size)) as pages:
+            async for page in pages:
+                for discord_id, wallet_address, threshold, window in page:
+                    self._wallets[discord_id] = wallet_address
+                    self._thresholds[discord_id] = threshold
+                    self._windows[discord_id] = window
+                self._load_cursor = page[-1][0]
+                self._subscribers = None
+                if deadline is not None and time.monotonic() >= deadline:
+                    logger.info(f"Loaded {len(self.subscribers())} subscribers so far, continuing after {self._load_cursor}")
+                    return
+
+        # Whatever changed while the pages were read is picked up by the next refresh
+        self._high_water = self._load_started
+        self._refreshed_at = time.time()
+        logger.info(f"Loaded {len(self.subscribers())} subscribers")
+
+    async def refresh(self, force: bool = False, budget: Optional[float] = None) -> None:
+        """Continue the initial load for at most ``budget`` seconds, or fetch settings changed since the last refresh"""
+        if not self.loaded:
+            await self._load_pages(deadline=None if budget is None else time.monotonic() + budget)
+            return
+
+        now = time.time()
+        if not force and now - self._refreshed_at < self.refresh_interval:
+            return
+
+        changes = await self.db.get_user_changes(self._high_water - self.clock_skew)
+        for discord_id, wallet_address, threshold, window, updated_at in changes:
+            if (
+                self._wallets.get(discord_id) != wallet_address
+                or self._thresholds.get(discord_id) != threshold
+                or self._windows.get(discord_id) != window
+            ):
+                self._set_wallet(discord_id, wallet_address)
+                self._set_threshold(discord_id, threshold, window)
+            self._high_water = max(self._high_water, updated_at)
+        self._refreshed_at = now
+
+    async def upsert_wallet(self, discord_id: int, wallet_address: str) -> None:
+        await self.db.upsert_wallet(discord_id, wallet_address)
+        self._set_wallet(discord_id, wallet_address)
+
+    async def upsert_price_watch(self, discord_id: int, threshold: float, window: str = DEFAULT_WINDOW) -> None:
+        await self.db.upsert_price_watch(discord_id, threshold, window)
+        self._set_threshold(discord_id, threshold, window)
+
+    def _set_wallet(self, discord_id: int, wallet_address: str) -> None:
+        if self.index is not None and self._wallets.get(discord_id) != wallet_address:
+            # The old wallet's tokens no longer apply, the next wallet fetch fills in the new ones
+            self.index.remove(discord_id)
+        self._wallets[discord_id] = wallet_address
+        self._subscribers = None
+
+    def _set_threshold(self, discord_id: int, threshold: float, window: str) -> None:
+        if self.index is not None:
+            self.index.set_threshold(discord_id, threshold, window)
+        self._thresholds[discord_id] = threshold
+        self._windows[discord_id] = window
+        self._subscribers = None
+
+    def get(self, discord_id: int) -> Optional[Subscriber]:
+        """The user's settings, None unless both wallet and threshold are configured"""
+        wallet_address = self._wallets.get(discord_id)
+        threshold = self._thresholds.get(discord_id)
+        if wallet_address is None or threshold is None:
+            return None
+        return Subscriber(discord_id, wallet_address, threshold, self._windows.get(discord_id, DEFAULT_WINDOW))
+
+    async def fetch(self, discord_id: int) -> Optional[Subscriber]:
+        """Like ``get`` but asks the database when the user is not known yet, e.g. set up through another process"""
+        subscriber = self.get(discord_id)
+        if subscriber is not None:
+            return subscriber
+
+        settings = await self.db.get_user_settings(discord_id)
+        if settings is None:
+            return None
+        self._wallets[discord_id], self._thresholds[discord_id], self._windows[discord_id] = settings
+        self._subscribers = None
+        return self.get(discord_id)
+
+    def subscribers(self, shard_ids: Optional[Iterable[int]] = None, num_shards: int = 1) -> List[Subscriber]:
+        """Users with both settings configured, optionally only those with ``discord_id % num_shards`` in ``shard_ids``"""
+        if self._subscribers is None:
+            self._subscribers = [
+                Subscriber(discord_id, wallet_address, self._thresholds[discord_id], self._windows.get(discord_id, DEFAULT_WINDOW))
+                for discord_id, wallet_address in self._wallets.items()
+                if discord_id in self._thresholds
+            ]
+        if shard_ids is None:
+            return self._subscribers
+
+        shard_ids = set(shard_ids)
+        return [subscriber for subscriber in self._subscribers if subscriber.discord_id % num_shards in shard_ids]
@@ -0,0 +1,51 @@
+from typing import List, Optional
+import hashlib
+import math
+import time
+
+from src.alerts.planner import Subscriber
+from src.monitoring.metrics import metrics
+
+ALERT_SWEEP_BEHIND = metrics.gauge("alert_sweep_behind_seconds", "How late the last processed sweep slot was handled")
+
+
+class SweepScheduler:
+    """Spreads the alert sweep evenly over its interval instead of checking everyone at once.
+
+    Every user gets a stable slot inside the interval derived from a hash of their discord id. The sweep ticks
+    often and each tick only checks users whose slot passed since the previous tick, so API calls and DMs go out
+    at a flat rate. ``behind_seconds`` tells how late the last processed slot was handled.
+    """
+
+    def __init__(self, interval: float = 5 * 60) -> None:
+        self.interval = interval
+        self._cursor: Optional[float] = None  # slots up to this time have been handled
+        self.behind_seconds = 0.0
+
+    def slot_offset(self, discord_id: int) -> float:
+        digest = hashlib.blake2b(str(discord_id).encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big") / 2**64 * self.interval
+
+    def _last_slot(self, discord_id: int, now: float) -> float:
+        offset = self.slot_offset(discord_id)
+        return math.floor((now - offset) / self.interval) * self.interval + offset
+
+    def due(self, subscribers: List[Subscriber], now: Optional[float] = None) -> List[Subscriber]:
+        """Subscribers whose slot fell between the previous tick and ``now``, each at most once"""
+        now = time.time() if now is None else now
+        if self._cursor is None:
+            self._cursor = now
+            return []
+
+        return [subscriber for subscriber in subscribers if self._last_slot(subscriber.discord_id, now) > self._cursor]
+
+    def mark_done(self, due: List[Subscriber], now: float, finished_at: Optional[float] = None) -> None:
+        """Advance past ``now`` once the subscribers returned by ``due(now)`` have been checked"""
+        finished_at = time.time() if finished_at is None else finished_at
+        if due:
+            earliest = min(self._last_slot(subscriber.discord_id, now) for subscriber in due)
+            self.behind_seconds = max(0.0, finished_at - earliest)
+        else:
+            self.behind_seconds = max(0.0, finished_at - now)
+        self._cursor = now
+        ALERT_SWEEP_BEHIND.set(self.behind_seconds)
@@ -0,0 +1,157 @@
+from typing import Optional, Set
+import asyncio
+import math
+import os
+import socket
+import time
+
+from src.alerts.cards import build_token_cards
+from src.alerts.planner import AlertCyclePlanner, create_planner
+from src.alerts.registry import SubscriberRegistry
+from src.alerts.scheduler import SweepScheduler
+from src.db.database import AsyncDatabaseConnection, DatabaseConnection
+from src.discord.logger import logger
+from src.monitoring.server import start_metrics_server
+from src.sol_data.data_manager import DataManager
+
+
+class ShardedAlertWorker:
+    """Alert checking for the shards of users this process holds a lease on.
+
+    Users are split into ``num_shards`` shards by ``discord_id % num_shards``. Every worker heartbeats, renews its
+    leases and claims or releases shards until it holds its fair share of the live workers. A crashed worker's leases
+    expire after ``lease_ttl`` seconds and are picked up by the others. Computed alerts go to the outbox table where
+    the gateway process (``ALERT_MODE=gateway``) picks them up; workers never talk to Discord.
+    """
+
+    def __init__(
+        self,
+        db: DatabaseConnection,
+        planner: AlertCyclePlanner,
+        registry: SubscriberRegistry,
+        worker_id: Optional[str] = None,
+        num_shards: int = int(os.getenv("ALERT_NUM_SHARDS", 16)),
+        lease_ttl: float = float(os.getenv("ALERT_LEASE_TTL_SECONDS", 30)),
+        sweep_interval: float = float(os.getenv("SWEEP_INTERVAL_SECONDS", 5 * 60)),
+        tick: float = float(os.getenv("SWEEP_TICK_SECONDS", 5)),
+    ) -> None:
+        self.db = db
+        self.planner = planner
+        self.registry = registry
+        self.worker_id = worker_id or os.getenv("ALERT_WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+        self.num_shards = num_shards
+        self.lease_ttl = lease_ttl
+        self.tick = tick
+        self.sweep = SweepScheduler(sweep_interval)
+        self.owned: Set[int] = set()
+        self._checked_shards: Set[int] = set()
+
+    async def rebalance(self) -> None:
+        now = time.time()
+        await asyncio.to_thread(self.db.heartbeat_worker, self.worker_id, now)
+        live_workers = await asyncio.to_thread(self.db.count_live_workers, now - self.lease_ttl)
+        fair_share = math.ceil(self.num_shards / max(1, live_workers))
+
+        for shard_id in sorted(self.owned):
+            if not await asyncio.to_thread(self.db.claim_shard, shard_id, self.worker_id, now, self.lease_ttl):
+                logger.warning(f"Worker {self.worker_id} lost the lease on shard {shard_id}")
+                self.owned.discard(shard_id)
+
+        # Hand shards back when new workers joined, so they can pick them up
+        while len(self.owned) > fair_share:
+            shard_id = max(self.owned)
+            await asyncio.to_thread(self.db.release_shard, shard_id, self.worker_id)
+            self.owned.discard(shard_id)
+
+        if len(self.owned) < fair_share:
+            for shard_id, owner, expires_at in await asyncio.to_thread(self.db.get_shard_leases):
+                if len(self.owned) >= fair_share:
+                    break
+                if shard_id >= self.num_shards or shard_id in self.owned or (owner is not None and expires_at >= now):
+                    continue
+                if await asyncio.to_thread(self.db.claim_shard, shard_id, self.worker_id, now, self.lease_ttl):
+                    self.owned.add(shard_id)
+
+        logger.info(f"Worker {self.worker_id} owns shards {sorted(self.owned)} ({live_workers} live workers)")
+
+    async def check_due_users(self) -> None:
+        now = time.time()
+        await self.registry.refresh(budget=self.tick / 2)
+        subscribers = self.registry.subscribers(self.owned, self.num_shards) if self.owned else []
+        if self.owned != self._checked_shards:
+            self._checked_shards = set(self.owned)
+            logger.info(f"Worker {self.worker_id} found {len(subscribers)} users to check")
+
+        due = self.sweep.due(subscribers, now)
+        try:
+            # The index may still list users of shards handed to another worker since
+            scheduled = {subscriber.discord_id for subscriber in due}
+            early = [
+                subscriber
+                for discord_id in await self.planner.early_holders()
+                if discord_id not in scheduled
+                and discord_id % self.num_shards in self.owned
+                and (subscriber := self.registry.get(discord_id)) is not None
+            ]
+            checked = due + early
+            if checked:
+                alerts_by_user = await self.planner.run(checked)
+                rows = [
+                    {"discord_id": subscriber.discord_id, "threshold": subscriber.threshold, "cards": cards, "created_at": time.time()}
+                    for subscriber in checked
+                    if (cards := build_token_cards(alerts_by_user.get(subscriber.discord_id, [])))
+                ]
+                await asyncio.to_thread(self.db.enqueue_alerts, rows)
+                logger.info(f"Worker {self.worker_id} queued alerts for {len(rows)} of {len(checked)} users")
+        finally:
+            self.sweep.mark_done(due, now)
+
+    async def _keep_leases(self) -> None:
+        """Runs beside the checks so a long planner run never lets our leases lapse"""
+        while True:
+            try:
+                await self.rebalance()
+            except Exception as e:
+                logger.error(f"Worker {self.worker_id} failed to renew its leases: {e}")
+            await asyncio.sleep(self.lease_ttl / 3)
+
+    async def run_forever(self) -> None:
+        await asyncio.to_thread(self.db.ensure_shards, self.num_shards)
+        leases = asyncio.create_task(self._keep_leases())
+        try:
+            while True:
+                try:
+                    await self.check_due_users()
+                except Exception as e:
+                    logger.error(f"Error in worker {self.worker_id} alert check: {e}")
+                # A streamed price crossing a threshold cuts the wait short
+                await self.planner.wait_for_crossing(self.tick)
+        finally:
+            leases.cancel()
+            await asyncio.to_thread(self.db.remove_worker, self.worker_id)
+
+
+async def _run_worker() -> None:
+    db = DatabaseConnection()
+    async_db = AsyncDatabaseConnection()
+    dm = DataManager()
+    planner = create_planner(dm, db)
+    metrics_runner = await start_metrics_server()
+    try:
+        if planner.stream is not None:
+            planner.stream.start()
+        await ShardedAlertWorker(db, planner, SubscriberRegistry(async_db, index=planner.index)).run_forever()
+    finally:
+        if planner.stream is not None:
+            await planner.stream.stop()
+        await dm.close()
+        await async_db.close()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+
+
+def run_worker():
+    try:
+        asyncio.run(_run_worker())
+    except KeyboardInterrupt:
+        pass
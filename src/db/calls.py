@@ -0,0 +1,18 @@
+from typing import Any, Callable
+import asyncio
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.discord.logger import logger
+
+
+async def db_call(fn: Callable[..., Any], *args: Any, default: Any = None, source: str = "Database") -> Any:
+    """Run a blocking DB call off the event loop; for stores where a database hiccup should cost a cache, not the cycle.
+
+    Database errors are logged with ``source`` in front and answered with ``default``.
+    """
+    try:
+        return await asyncio.to_thread(fn, *args)
+    except SQLAlchemyError as e:
+        logger.error(f"{source} database error: {e}")
+        return default
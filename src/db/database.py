@@ -1,9 +1,14 @@
-from typing import Optional, List, Tuple
-from sqlalchemy import URL, BigInteger, Column, Float, String, create_engine, select
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import JSON, URL, BigInteger, Boolean, Column, Float, Integer, String, create_engine, delete, func, inspect, or_, select, text, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.dialects import postgresql, sqlite
 from dotenv import load_dotenv
 import os
+import time
+
+from src.sol_data.price_history import DEFAULT_WINDOW
 
 load_dotenv()
 
@@ -16,15 +21,83 @@ class Wallet(Base):
     __tablename__ = "wallet"
     discord_id = Column(BigInteger, primary_key=True)
     wallet_address = Column(String(100), nullable=False)
+    updated_at = Column(Float, nullable=False, default=0, server_default="0", index=True)  # unix seconds
 
 
 class PriceWatch(Base):
     __tablename__ = "price_watch"
     discord_id = Column(BigInteger, primary_key=True)
     threshold = Column(Float, nullable=False)
+    change_window = Column(String(8), nullable=False, default=DEFAULT_WINDOW, server_default=DEFAULT_WINDOW)  # a key of WINDOWS
+    updated_at = Column(Float, nullable=False, default=0, server_default="0", index=True)  # unix seconds
+
+
+class TokenCreationInfo(Base):
+    """Mirror of TokenCreationInfoResponse, which never changes once a token exists"""
+
+    __tablename__ = "token_creation_info"
+    token_address = Column(String(100), primary_key=True)
+    tx_hash = Column(String(120))
+    slot = Column(BigInteger)
+    decimals = Column(Integer)
+    owner = Column(String(100))
+    block_unix_time = Column(BigInteger)
+    block_human_time = Column(String(64))
+
+
+class TokenSecurity(Base):
+    """Raw TokenSecurityResponse payload, refreshed once it is older than the configured max age"""
+
+    __tablename__ = "token_security"
+    token_address = Column(String(100), primary_key=True)
+    data = Column(JSON, nullable=False)
+    updated_at = Column(BigInteger, nullable=False)  # unix seconds
+
+
+class WorkerHeartbeat(Base):
+    """Heartbeat of every running alert worker, used to split shards fairly"""
+
+    __tablename__ = "worker_heartbeat"
+    worker_id = Column(String(100), primary_key=True)
+    heartbeat_at = Column(Float, nullable=False)  # unix seconds
+
+
+class ShardLease(Base):
+    """A worker owns the users with ``discord_id % num_shards == shard_id`` while its lease has not expired"""
+
+    __tablename__ = "shard_lease"
+    shard_id = Column(Integer, primary_key=True)
+    owner = Column(String(100))
+    expires_at = Column(Float, nullable=False, default=0)  # unix seconds
 
 
-url = URL.create(
+class PendingAlert(Base):
+    """Outbox of computed alerts waiting for the gateway process to DM them"""
+
+    __tablename__ = "pending_alert"
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    discord_id = Column(BigInteger, nullable=False)
+    threshold = Column(Float, nullable=False)
+    cards = Column(JSON, nullable=False)
+    created_at = Column(Float, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")  # failed deliveries so far
+    available_at = Column(Float, nullable=False, default=0, server_default="0")  # not handed out again before this
+    delivered_at = Column(Float, index=True)  # set once the alert needs no more delivery attempts
+    outcome = Column(String(16))  # how the last attempt ended: sent, forbidden, not_found, empty, failed or expired
+
+
+class AlertState(Base):
+    """Last alert sent to a user for a token, used for cooldown and re-arming"""
+
+    __tablename__ = "alert_state"
+    discord_id = Column(BigInteger, primary_key=True)
+    token_address = Column(String(100), primary_key=True)
+    last_alerted_at = Column(Float, nullable=False)  # unix seconds
+    last_change = Column(Float, nullable=False)
+    armed = Column(Boolean, nullable=False, default=False)
+
+
+url = os.getenv("DB_URL") or URL.create(
     "postgresql+psycopg2",
     username=os.getenv("DB_USER"),
     password=os.getenv("DB_PASSWORD"),
@@ -33,20 +106,62 @@ url = URL.create(
     database=os.getenv("DB_NAME"),
 )
 
+# Async drivers used by AsyncDatabaseConnection for the sync URL's backend
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def _add_missing_columns(conn):
+    """create_all never alters existing tables, so add columns introduced after a table was first created"""
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=conn.dialect)}"
+            if column.server_default is not None:
+                ddl += " DEFAULT '" + str(column.server_default.arg).replace("'", "''") + "'"
+            if not column.nullable:
+                ddl += " NOT NULL"
+            conn.execute(text(ddl))
+            for index in table.indexes:
+                if column in index.columns.values():
+                    index.create(conn, checkfirst=True)
+
+
+def _create_schema(conn):
+    Base.metadata.create_all(conn)
+    _add_missing_columns(conn)
+
+
+def _dialect_insert(dialect_name: str, table):
+    """Dialect specific INSERT so upserts work on Postgres and on a local SQLite database"""
+    if dialect_name == "sqlite":
+        return sqlite.insert(table)
+    return postgresql.insert(table)
+
 
 class DatabaseConnection:
-    def __init__(self) -> None:
-        self.engine = create_engine(url=url, connect_args={"sslmode": "require"})
+    def __init__(self, db_url=None) -> None:
+        db_url = db_url or url
+        connect_args = {"sslmode": "require"} if str(db_url).startswith("postgresql") else {}
+        self.engine = create_engine(url=db_url, connect_args=connect_args)
         self.create_tables()
 
     def create_tables(self):
-        Base.metadata.create_all(self.engine)
+        with self.engine.begin() as conn:
+            _create_schema(conn)
         print("All tables created!")
 
+    def _insert(self, table):
+        return _dialect_insert(self.engine.dialect.name, table)
+
     def upsert_wallet(self, discord_id: int, wallet_address: str):
         with self.engine.begin() as conn:
-            stmt = insert(Wallet).values(discord_id=discord_id, wallet_address=wallet_address)
-            stmt = stmt.on_conflict_do_update(index_elements=["discord_id"], set_={"wallet_address": stmt.excluded.wallet_address})
+            stmt = self._insert(Wallet).values(discord_id=discord_id, wallet_address=wallet_address, updated_at=time.time())
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["discord_id"], set_={"wallet_address": stmt.excluded.wallet_address, "updated_at": stmt.excluded.updated_at}
+            )
             conn.execute(stmt)
 
     def get_wallet(self, discord_id: int) -> Optional[Wallet]:
@@ -55,10 +170,13 @@ class DatabaseConnection:
             result = conn.execute(stmt)
             return result.mappings().one_or_none()
 
-    def upsert_price_watch(self, discord_id: int, threshold: float):
+    def upsert_price_watch(self, discord_id: int, threshold: float, window: str = DEFAULT_WINDOW):
         with self.engine.begin() as conn:
-            stmt = insert(PriceWatch).values(discord_id=discord_id, threshold=threshold)
-            stmt = stmt.on_conflict_do_update(index_elements=["discord_id"], set_={"threshold": stmt.excluded.threshold})
+            stmt = self._insert(PriceWatch).values(discord_id=discord_id, threshold=threshold, change_window=window, updated_at=time.time())
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["discord_id"],
+                set_={"threshold": stmt.excluded.threshold, "change_window": stmt.excluded.change_window, "updated_at": stmt.excluded.updated_at},
+            )
             conn.execute(stmt)
 
     def get_price_watch(self, discord_id: int) -> Optional[PriceWatch]:
@@ -67,9 +185,291 @@ class DatabaseConnection:
             result = conn.execute(stmt)
             return result.mappings().one_or_none()
 
-    def get_all_users_with_settings(self) -> List[Tuple[int, str, float]]:
-        """Get all users who have both wallet address and price watch threshold configured"""
+    def get_all_users_with_settings(self) -> List[Tuple[int, str, float, str]]:
+        """(discord_id, wallet_address, threshold, window) of users with both wallet address and price watch configured"""
         with self.engine.begin() as conn:
-            stmt = select(Wallet.discord_id, Wallet.wallet_address, PriceWatch.threshold).join(PriceWatch, Wallet.discord_id == PriceWatch.discord_id)
+            stmt = select(Wallet.discord_id, Wallet.wallet_address, PriceWatch.threshold, PriceWatch.change_window).join(PriceWatch, Wallet.discord_id == PriceWatch.discord_id)
             result = conn.execute(stmt)
-            return [(row.discord_id, row.wallet_address, row.threshold) for row in result.mappings()]
+            return [(row.discord_id, row.wallet_address, row.threshold, row.change_window) for row in result.mappings()]
+
+    def get_token_creation_infos(self, token_addresses: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Bulk lookup of stored creation info keyed by token address"""
+        token_addresses = list(token_addresses)
+        if not token_addresses:
+            return {}
+
+        with self.engine.begin() as conn:
+            stmt = select(TokenCreationInfo).where(TokenCreationInfo.token_address.in_(token_addresses))
+            result = conn.execute(stmt)
+            return {row["token_address"]: dict(row) for row in result.mappings()}
+
+    def upsert_token_creation_infos(self, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+
+        with self.engine.begin() as conn:
+            stmt = self._insert(TokenCreationInfo).values(rows)
+            stmt = stmt.on_conflict_do_nothing(index_elements=["token_address"])
+            conn.execute(stmt)
+
+    def get_token_securities(self, token_addresses: Iterable[str], updated_after: int = 0) -> Dict[str, Dict[str, Any]]:
+        """Bulk lookup of stored security payloads that were refreshed after ``updated_after`` (unix seconds)"""
+        token_addresses = list(token_addresses)
+        if not token_addresses:
+            return {}
+
+        with self.engine.begin() as conn:
+            stmt = select(TokenSecurity.token_address, TokenSecurity.data).where(
+                TokenSecurity.token_address.in_(token_addresses), TokenSecurity.updated_at > updated_after
+            )
+            result = conn.execute(stmt)
+            return {row.token_address: row.data for row in result}
+
+    def upsert_token_securities(self, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+
+        with self.engine.begin() as conn:
+            stmt = self._insert(TokenSecurity).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["token_address"], set_={"data": stmt.excluded.data, "updated_at": stmt.excluded.updated_at}
+            )
+            conn.execute(stmt)
+
+    def heartbeat_worker(self, worker_id: str, now: float):
+        with self.engine.begin() as conn:
+            stmt = self._insert(WorkerHeartbeat).values(worker_id=worker_id, heartbeat_at=now)
+            stmt = stmt.on_conflict_do_update(index_elements=["worker_id"], set_={"heartbeat_at": stmt.excluded.heartbeat_at})
+            conn.execute(stmt)
+
+    def count_live_workers(self, alive_after: float) -> int:
+        with self.engine.begin() as conn:
+            stmt = select(func.count()).select_from(WorkerHeartbeat).where(WorkerHeartbeat.heartbeat_at > alive_after)
+            return conn.execute(stmt).scalar_one()
+
+    def remove_worker(self, worker_id: str):
+        with self.engine.begin() as conn:
+            conn.execute(delete(WorkerHeartbeat).where(WorkerHeartbeat.worker_id == worker_id))
+            conn.execute(update(ShardLease).where(ShardLease.owner == worker_id).values(owner=None, expires_at=0))
+
+    def ensure_shards(self, num_shards: int):
+        with self.engine.begin() as conn:
+            stmt = self._insert(ShardLease).values([{"shard_id": shard_id, "owner": None, "expires_at": 0} for shard_id in range(num_shards)])
+            conn.execute(stmt.on_conflict_do_nothing(index_elements=["shard_id"]))
+
+    def get_shard_leases(self) -> List[Tuple[int, Optional[str], float]]:
+        with self.engine.begin() as conn:
+            result = conn.execute(select(ShardLease.shard_id, ShardLease.owner, ShardLease.expires_at).order_by(ShardLease.shard_id))
+            return [(row.shard_id, row.owner, row.expires_at) for row in result]
+
+    def claim_shard(self, shard_id: int, owner: str, now: float, ttl: float) -> bool:
+        """Take or renew a lease; only succeeds if the shard is free, expired or already ours"""
+        with self.engine.begin() as conn:
+            stmt = (
+                update(ShardLease)
+                .where(ShardLease.shard_id == shard_id, or_(ShardLease.owner.is_(None), ShardLease.owner == owner, ShardLease.expires_at < now))
+                .values(owner=owner, expires_at=now + ttl)
+            )
+            return conn.execute(stmt).rowcount == 1
+
+    def release_shard(self, shard_id: int, owner: str):
+        with self.engine.begin() as conn:
+            stmt = update(ShardLease).where(ShardLease.shard_id == shard_id, ShardLease.owner == owner).values(owner=None, expires_at=0)
+            conn.execute(stmt)
+
+    def enqueue_alerts(self, rows: List[Dict[str, Any]]):
+        """Rows need discord_id, threshold, cards and created_at"""
+        if not rows:
+            return
+
+        with self.engine.begin() as conn:
+            conn.execute(self._insert(PendingAlert).values(rows))
+
+    def get_alert_states(self, discord_ids: Iterable[int]) -> Dict[Tuple[int, str], Dict[str, Any]]:
+        discord_ids = list(discord_ids)
+        if not discord_ids:
+            return {}
+
+        with self.engine.begin() as conn:
+            stmt = select(AlertState).where(AlertState.discord_id.in_(discord_ids))
+            return {(row["discord_id"], row["token_address"]): dict(row) for row in conn.execute(stmt).mappings()}
+
+    def upsert_alert_states(self, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+
+        with self.engine.begin() as conn:
+            stmt = self._insert(AlertState).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["discord_id", "token_address"],
+                set_={
+                    "last_alerted_at": stmt.excluded.last_alerted_at,
+                    "last_change": stmt.excluded.last_change,
+                    "armed": stmt.excluded.armed,
+                },
+            )
+            conn.execute(stmt)
+
+
+class AsyncDatabaseConnection:
+    """Non-blocking counterpart of DatabaseConnection for the queries made on the bot's event loop.
+
+    Runs on asyncpg for Postgres and aiosqlite for SQLite, derived from the same URL as the sync connection. Postgres
+    connections come from a bounded pool and every checkout is pre-pinged, so a restarted database or an idle
+    connection closed by the server costs a reconnect instead of a failed command.
+    """
+
+    def __init__(
+        self,
+        db_url=None,
+        pool_size: int = int(os.getenv("DB_POOL_SIZE", 5)),
+        max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        pool_timeout: float = float(os.getenv("DB_POOL_TIMEOUT", 30)),
+        pool_recycle: int = int(os.getenv("DB_POOL_RECYCLE", 1800)),
+    ) -> None:
+        db_url = make_url(db_url or url)
+        db_url = db_url.set(drivername=ASYNC_DRIVERS.get(db_url.get_backend_name(), db_url.drivername))
+        if db_url.get_backend_name() == "postgresql":
+            self.engine = create_async_engine(
+                db_url,
+                connect_args={"ssl": "require"},
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+                pool_timeout=pool_timeout,
+                pool_recycle=pool_recycle,
+                pool_pre_ping=True,
+            )
+        else:
+            # SQLite picks its own pool, sizing does not apply to a local file
+            self.engine = create_async_engine(db_url, pool_pre_ping=True)
+
+    async def create_tables(self):
+        async with self.engine.begin() as conn:
+            await conn.run_sync(_create_schema)
+
+    async def close(self):
+        await self.engine.dispose()
+
+    def _insert(self, table):
+        return _dialect_insert(self.engine.dialect.name, table)
+
+    async def upsert_wallet(self, discord_id: int, wallet_address: str):
+        async with self.engine.begin() as conn:
+            stmt = self._insert(Wallet).values(discord_id=discord_id, wallet_address=wallet_address, updated_at=time.time())
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["discord_id"], set_={"wallet_address": stmt.excluded.wallet_address, "updated_at": stmt.excluded.updated_at}
+            )
+            await conn.execute(stmt)
+
+    async def get_wallet(self, discord_id: int) -> Optional[Wallet]:
+        async with self.engine.begin() as conn:
+            stmt = select(Wallet).where(Wallet.discord_id == discord_id)
+            result = await conn.execute(stmt)
+            return result.mappings().one_or_none()
+
+    async def upsert_price_watch(self, discord_id: int, threshold: float, window: str = DEFAULT_WINDOW):
+        async with self.engine.begin() as conn:
+            stmt = self._insert(PriceWatch).values(discord_id=discord_id, threshold=threshold, change_window=window, updated_at=time.time())
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["discord_id"],
+                set_={"threshold": stmt.excluded.threshold, "change_window": stmt.excluded.change_window, "updated_at": stmt.excluded.updated_at},
+            )
+            await conn.execute(stmt)
+
+    async def get_price_watch(self, discord_id: int) -> Optional[PriceWatch]:
+        async with self.engine.begin() as conn:
+            stmt = select(PriceWatch).where(PriceWatch.discord_id == discord_id)
+            result = await conn.execute(stmt)
+            return result.mappings().one_or_none()
+
+    async def get_user_settings(self, discord_id: int) -> Optional[Tuple[str, float, str]]:
+        """Wallet address, threshold and window of a user in one query, None unless both are configured"""
+        async with self.engine.begin() as conn:
+            stmt = (
+                select(Wallet.wallet_address, PriceWatch.threshold, PriceWatch.change_window)
+                .join(PriceWatch, Wallet.discord_id == PriceWatch.discord_id)
+                .where(Wallet.discord_id == discord_id)
+            )
+            row = (await conn.execute(stmt)).one_or_none()
+            return None if row is None else (row.wallet_address, row.threshold, row.change_window)
+
+    async def get_user_changes(self, since: float) -> List[Tuple[int, str, float, str, float]]:
+        """Users with both settings whose wallet or threshold was written after ``since``, as (discord_id, wallet_address, threshold, window, updated_at)"""
+        async with self.engine.begin() as conn:
+            stmt = (
+                select(
+                    Wallet.discord_id,
+                    Wallet.wallet_address,
+                    PriceWatch.threshold,
+                    PriceWatch.change_window,
+                    Wallet.updated_at,
+                    PriceWatch.updated_at.label("threshold_updated_at"),
+                )
+                .join(PriceWatch, Wallet.discord_id == PriceWatch.discord_id)
+                .where(or_(Wallet.updated_at > since, PriceWatch.updated_at > since))
+            )
+            result = await conn.execute(stmt)
+            return [(row.discord_id, row.wallet_address, row.threshold, row.change_window, max(row.updated_at, row.threshold_updated_at)) for row in result]
+
+    async def stream_users_with_settings(self, after: Optional[int] = None, page_size: int = 1000) -> AsyncIterator[List[Tuple[int, str, float, str]]]:
+        """Users with both settings in ``discord_id`` order, in pages of ``page_size`` read from a server-side cursor.
+
+        Pass the last ``discord_id`` seen as ``after`` to resume a stream that was interrupted. Close the iterator
+        (``contextlib.aclosing``) when stopping early so the cursor's connection goes back to the pool.
+        """
+        stmt = (
+            select(Wallet.discord_id, Wallet.wallet_address, PriceWatch.threshold, PriceWatch.change_window)
+            .join(PriceWatch, Wallet.discord_id == PriceWatch.discord_id)
+            .order_by(Wallet.discord_id)
+        )
+        if after is not None:
+            stmt = stmt.where(Wallet.discord_id > after)
+
+        async with self.engine.connect() as conn:
+            result = await conn.stream(stmt.execution_options(yield_per=page_size))
+            async for page in result.partitions():
+                yield [(row.discord_id, row.wallet_address, row.threshold, row.change_window) for row in page]
+
+    async def get_pending_alerts(self, now: Optional[float] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Undelivered alerts in the order they were queued, leaving out those waiting for a retry"""
+        async with self.engine.begin() as conn:
+            stmt = (
+                select(PendingAlert)
+                .where(PendingAlert.delivered_at.is_(None), PendingAlert.available_at <= (time.time() if now is None else now))
+                .order_by(PendingAlert.id)
+                .limit(limit)
+            )
+            return [dict(row) for row in (await conn.execute(stmt)).mappings()]
+
+    async def mark_alerts_delivered(self, alert_ids: List[int], now: float, outcome: str = "sent"):
+        if not alert_ids:
+            return
+
+        async with self.engine.begin() as conn:
+            await conn.execute(update(PendingAlert).where(PendingAlert.id.in_(alert_ids)).values(delivered_at=now, outcome=outcome))
+
+    async def retry_alerts(self, alert_ids: List[int], available_at: float):
+        """Count a failed delivery and hold the alerts back until ``available_at``"""
+        if not alert_ids:
+            return
+
+        async with self.engine.begin() as conn:
+            stmt = update(PendingAlert).where(PendingAlert.id.in_(alert_ids))
+            await conn.execute(stmt.values(attempts=PendingAlert.attempts + 1, available_at=available_at, outcome="failed"))
+
+    async def expire_alerts(self, created_before: float, now: float, exclude: Iterable[int] = ()) -> int:
+        """Close undelivered alerts computed before ``created_before`` as ``expired``, except ``exclude``, returns how many"""
+        exclude = list(exclude)
+        async with self.engine.begin() as conn:
+            stmt = update(PendingAlert).where(PendingAlert.delivered_at.is_(None), PendingAlert.created_at < created_before)
+            if exclude:
+                stmt = stmt.where(PendingAlert.id.notin_(exclude))
+            return (await conn.execute(stmt.values(delivered_at=now, outcome="expired"))).rowcount
+
+    async def count_pending_alerts(self) -> int:
+        async with self.engine.begin() as conn:
+            return (await conn.execute(select(func.count()).select_from(PendingAlert).where(PendingAlert.delivered_at.is_(None)))).scalar_one()
+
+    async def prune_delivered_alerts(self, delivered_before: float) -> int:
+        async with self.engine.begin() as conn:
+            return (await conn.execute(delete(PendingAlert).where(PendingAlert.delivered_at < delivered_before))).rowcount
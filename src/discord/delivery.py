@@ -0,0 +1,181 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional
+import asyncio
+import os
+import random
+import time
+
+import discord
+
+from src.discord.logger import logger
+from src.monitoring.metrics import metrics
+
+# https://discord.com/developers/docs/resources/message#create-message
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_DESCRIPTION = 4096
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+ALERT_DMS = metrics.counter("alert_dms_total", "Alert DMs handed to Discord by outcome", ["outcome"])
+ALERT_DELIVERY_QUEUE = metrics.gauge("alert_delivery_queue_depth", "Alert DMs waiting in the delivery queue")
+
+
+@dataclass
+class DeliveryJob:
+    discord_id: int
+    threshold: float
+    cards: List[str]
+    outbox_id: Optional[int] = None  # set when the job comes from the pending_alert outbox
+    attempts: int = 0  # outbox deliveries of this alert that failed before
+    expires_at: Optional[float] = None  # unix seconds after which the alerts are too old to send
+
+
+def pack_cards(cards: List[str]) -> List[List[str]]:
+    """Group cards into as few messages as Discord allows, one embed per card"""
+    messages: List[List[str]] = []
+    current: List[str] = []
+    current_chars = 0
+    for card in cards:
+        card = card[:MAX_EMBED_DESCRIPTION]
+        if current and (len(current) == MAX_EMBEDS_PER_MESSAGE or current_chars + len(card) > MAX_EMBED_CHARS_PER_MESSAGE):
+            messages.append(current)
+            current, current_chars = [], 0
+        current.append(card)
+        current_chars += len(card)
+    if current:
+        messages.append(current)
+    return messages
+
+
+class DeliveryQueue:
+    """Outbound queue for alert DMs, drained by a background task.
+
+    Producers only ``enqueue`` and never wait on Discord. The consumer caches resolved DM channels, packs every
+    user's cards into as few messages as possible, spaces sends by ``min_send_interval`` and retries rate limited
+    or failed sends with exponential backoff, honouring Discord's ``retry_after`` when it is given. Every finished
+    job is passed to ``on_done`` with its outcome: ``sent``, ``forbidden``, ``not_found``, ``empty``, ``expired`` or
+    ``failed``.
+    """
+
+    def __init__(
+        self,
+        client: discord.Client,
+        on_done: Optional[Callable[[DeliveryJob, str], Awaitable[None]]] = None,
+        min_send_interval: float = float(os.getenv("DELIVERY_MIN_SEND_INTERVAL", 0.05)),
+        max_retries: int = int(os.getenv("DELIVERY_MAX_RETRIES", 5)),
+        channel_cache_size: int = 10_000,
+    ) -> None:
+        self.client = client
+        self.on_done = on_done
+        self.min_send_interval = min_send_interval
+        self.max_retries = max_retries
+        self.channel_cache_size = channel_cache_size
+        self.queue: "asyncio.Queue[DeliveryJob]" = asyncio.Queue()
+        self._channels: "OrderedDict[int, discord.DMChannel]" = OrderedDict()
+        self._last_send = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="alert-delivery")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def enqueue(self, job: DeliveryJob) -> None:
+        self.queue.put_nowait(job)
+        ALERT_DELIVERY_QUEUE.set(self.queue.qsize())
+
+    async def _run(self) -> None:
+        while True:
+            job = await self.queue.get()
+            outcome = "failed"
+            try:
+                outcome = await self.deliver(job)
+            except Exception as e:
+                logger.error(f"Error delivering alerts to user {job.discord_id}: {e}")
+                ALERT_DMS.inc(outcome="failed")
+            finally:
+                self.queue.task_done()
+                ALERT_DELIVERY_QUEUE.set(self.queue.qsize())
+
+            if self.on_done is not None:
+                try:
+                    await self.on_done(job, outcome)
+                except Exception as e:
+                    logger.error(f"Error recording the delivery of alerts for user {job.discord_id}: {e}")
+
+    async def _get_channel(self, discord_id: int) -> discord.DMChannel:
+        channel = self._channels.get(discord_id)
+        if channel is not None:
+            self._channels.move_to_end(discord_id)
+            return channel
+
+        user = self.client.get_user(discord_id) or await self._with_retries(lambda: self.client.fetch_user(discord_id))
+        channel = user.dm_channel or await self._with_retries(user.create_dm)
+        self._channels[discord_id] = channel
+        if len(self._channels) > self.channel_cache_size:
+            self._channels.popitem(last=False)
+        return channel
+
+    async def _with_retries(self, call: Callable[[], Awaitable]):
+        for attempt in range(self.max_retries + 1):
+            wait = self.min_send_interval - (time.monotonic() - self._last_send)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_send = time.monotonic()
+
+            try:
+                return await call()
+            except discord.HTTPException as e:
+                retryable = e.status == 429 or e.status >= 500
+                if not retryable or attempt == self.max_retries:
+                    raise
+                retry_after = getattr(e, "retry_after", None)
+                delay = retry_after if retry_after else min(30.0, 0.5 * 2**attempt) * (1 + random.random())
+                logger.warning(f"Discord returned {e.status}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def deliver(self, job: DeliveryJob) -> str:
+        """Send the job's DMs and return the outcome; only ``failed`` is worth another attempt later"""
+        if not job.cards:
+            logger.info(f"No tokens meeting threshold for user {job.discord_id}")
+            return "empty"
+        if job.expires_at is not None and time.time() >= job.expires_at:
+            logger.warning(f"Dropping {len(job.cards)} alerts for user {job.discord_id}, they are too old to send")
+            return "expired"
+
+        try:
+            channel = await self._get_channel(job.discord_id)
+        except discord.NotFound:
+            logger.warning(f"Could not find Discord user with ID {job.discord_id}")
+            return "not_found"
+        except discord.Forbidden:
+            # create_dm is refused when the user shares no server with the bot or has DMs closed
+            logger.warning(f"Cannot open a DM with user {job.discord_id} - DMs might be disabled")
+            ALERT_DMS.inc(outcome="forbidden")
+            return "forbidden"
+
+        header = f"🚨 **Price Alert!** Found {len(job.cards)} tokens that meet your {job.threshold}% threshold:"
+        try:
+            for i, group in enumerate(pack_cards(job.cards)):
+                embeds = [discord.Embed(description=card) for card in group]
+                content = header if i == 0 else None
+                await self._with_retries(lambda: channel.send(content=content, embeds=embeds))
+            logger.info(f"Sent {len(job.cards)} alerts to user {job.discord_id}")
+            ALERT_DMS.inc(outcome="sent")
+            return "sent"
+        except discord.Forbidden:
+            logger.warning(f"Cannot send DM to user {job.discord_id} - DMs might be disabled")
+            self._channels.pop(job.discord_id, None)
+            ALERT_DMS.inc(outcome="forbidden")
+            return "forbidden"
+        except discord.HTTPException as e:
+            logger.error(f"HTTP error sending DM to user {job.discord_id}: {e}")
+            ALERT_DMS.inc(outcome="failed")
+            return "failed"
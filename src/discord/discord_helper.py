@@ -1,16 +1,49 @@
-from typing import Optional
+from typing import List, Set
 from dotenv import load_dotenv
 import os
+import time
 import discord
 from discord.ext import tasks
-from src.sol_data.data_models import TokenOverviewResponse, WalletPortfolioItem
-from src.db.database import DatabaseConnection
-from src.sol_data.data_manager import DataManager, DataManagerAPIError
+from src.db.database import AsyncDatabaseConnection, DatabaseConnection
+from src.sol_data.price_history import DEFAULT_WINDOW, WINDOWS
+from src.sol_data.data_manager import BIRDEYE_CACHE_LOOKUPS, BIRDEYE_REQUEST_SECONDS, BIRDEYE_REQUESTS, DataManager
+from src.sol_data.rate_limiter import Priority, request_priority
+from src.alerts.cards import build_token_cards
+from src.alerts.planner import ALERT_ALERTS, ALERT_CYCLE_SECONDS, ALERT_SUPPRESSED, ALERT_TOKENS_CHECKED, ALERT_USERS_CHECKED, Subscriber, TokenAlert, create_planner
+from src.alerts.registry import SubscriberRegistry
+from src.alerts.scheduler import SweepScheduler
+from src.discord.delivery import ALERT_DMS, DeliveryJob, DeliveryQueue
 from src.discord.logger import handler, logger
+from src.monitoring.metrics import metrics
+from src.monitoring.server import start_metrics_server
+from src.sol_data.resilience import backoff_delay
 
 load_dotenv()
 
-WRAPPED_TOKENS = {"SOL": "So11111111111111111111111111111111111111112", "ETH": "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"}
+# Every user is checked once per interval; the sweep wakes up every tick to check the users whose slot has come
+SWEEP_INTERVAL_SECONDS = float(os.getenv("SWEEP_INTERVAL_SECONDS", 5 * 60))
+SWEEP_TICK_SECONDS = float(os.getenv("SWEEP_TICK_SECONDS", 5))
+
+# "local" runs the alert sweep in this process, "gateway" delivers alerts computed by worker.py processes
+ALERT_MODE = os.getenv("ALERT_MODE", "local").lower()
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", 5))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 100))
+# Failed deliveries go back to the outbox with backoff, alerts still failing after this many attempts are dropped
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 8))
+OUTBOX_RETRY_BASE_SECONDS = float(os.getenv("OUTBOX_RETRY_BASE_SECONDS", 30))
+OUTBOX_RETRY_MAX_SECONDS = float(os.getenv("OUTBOX_RETRY_MAX_SECONDS", 30 * 60))
+# Alerts older than this are price moves nobody needs anymore, they are marked expired instead of sent
+OUTBOX_MAX_AGE_SECONDS = float(os.getenv("OUTBOX_MAX_AGE_SECONDS", 15 * 60))
+# Delivered alerts are kept this long for inspection, then deleted
+OUTBOX_RETENTION_SECONDS = float(os.getenv("OUTBOX_RETENTION_SECONDS", 7 * 24 * 3600))
+
+ALERT_OUTBOX_PENDING = metrics.gauge("alert_outbox_pending", "Alerts in the pending_alert outbox not delivered yet")
+ALERT_OUTBOX_RETRIES = metrics.counter("alert_outbox_retries_total", "Outbox alerts put back for another delivery attempt")
+ALERT_OUTBOX_DROPPED = metrics.counter("alert_outbox_dropped_total", "Outbox alerts given up on after OUTBOX_MAX_ATTEMPTS failures")
+ALERT_OUTBOX_EXPIRED = metrics.counter("alert_outbox_expired_total", "Outbox alerts not sent because they were older than OUTBOX_MAX_AGE_SECONDS")
+
+# Discord user ids allowed to run /stats, besides server administrators
+ADMIN_DISCORD_IDS = {int(discord_id) for discord_id in os.getenv("ADMIN_DISCORD_IDS", "").split(",") if discord_id.strip()}
 
 intents = discord.Intents.default()
 intents.message_content = True
@@ -21,12 +54,67 @@ class MyClient(discord.Client):
         super().__init__(intents=intents)
         self.tree = discord.app_commands.CommandTree(self)
         self.db = DatabaseConnection()
+        # Queries awaited by commands and loops go through the async engine so they never block the event loop
+        self.async_db = AsyncDatabaseConnection()
         self.dm = DataManager()
+        self.planner = create_planner(self.dm, self.db)
+        self.sweep = SweepScheduler(SWEEP_INTERVAL_SECONDS)
+        self.registry = SubscriberRegistry(self.async_db, index=self.planner.index)
+        self.stats_logged_at = 0.0
+        self.delivery = DeliveryQueue(self, on_done=self.finish_outbox_job)
+        self.outbox_in_flight: Set[int] = set()
+        self.outbox_pruned_at = 0.0
+        self.metrics_runner = None
 
     async def setup_hook(self) -> None:
         await self.tree.sync()
-        # Start the automatic alert checking task
-        automatic_alerts.start()
+        self.metrics_runner = await start_metrics_server()
+        self.delivery.start()
+        if ALERT_MODE == "gateway":
+            # Sharded workers compute the alerts, this process only delivers them
+            deliver_pending_alerts.start()
+        else:
+            # Start the automatic alert checking task
+            automatic_alerts.start()
+            if self.planner.stream is not None:
+                self.planner.stream.start()
+
+    async def finish_outbox_job(self, job: DeliveryJob, outcome: str) -> None:
+        """Record how an outbox alert's delivery ended, a failed one is put back for a later attempt"""
+        if job.outbox_id is None:
+            return
+        now = time.time()
+        try:
+            delay = OUTBOX_RETRY_BASE_SECONDS + backoff_delay(job.attempts, OUTBOX_RETRY_BASE_SECONDS, OUTBOX_RETRY_MAX_SECONDS)
+            if outcome == "failed" and job.expires_at is not None and now + delay >= job.expires_at:
+                # The retry would come too late anyway
+                outcome = "expired"
+            if outcome == "expired":
+                ALERT_OUTBOX_EXPIRED.inc()
+            if outcome == "failed" and job.attempts + 1 < OUTBOX_MAX_ATTEMPTS:
+                await self.async_db.retry_alerts([job.outbox_id], now + delay)
+                ALERT_OUTBOX_RETRIES.inc()
+                logger.warning(f"Alerts for user {job.discord_id} failed delivery {job.attempts + 1} times, retrying in {delay:.0f}s")
+            else:
+                if outcome == "failed":
+                    ALERT_OUTBOX_DROPPED.inc()
+                    logger.error(f"Giving up on alerts for user {job.discord_id} after {job.attempts + 1} failed deliveries")
+                await self.async_db.mark_alerts_delivered([job.outbox_id], now, outcome)
+        finally:
+            # Should the update fail, the row is still pending and is picked up again on the next poll
+            self.outbox_in_flight.discard(job.outbox_id)
+
+    async def close(self) -> None:
+        automatic_alerts.cancel()
+        deliver_pending_alerts.cancel()
+        await self.delivery.stop()
+        if self.planner.stream is not None:
+            await self.planner.stream.stop()
+        await self.dm.close()
+        await self.async_db.close()
+        if self.metrics_runner is not None:
+            await self.metrics_runner.cleanup()
+        await super().close()
 
 
 client = MyClient(intents=intents)
@@ -37,52 +125,107 @@ async def on_ready():
     logger.info(f"Logged in as user {client.user} with ID {client.user.id}")
 
 
-@tasks.loop(minutes=5)
+@tasks.loop(seconds=SWEEP_TICK_SECONDS)
 async def automatic_alerts():
-    """Background task that runs every 5 minutes to check alerts for all users"""
-    logger.info("Starting automatic alert check for all users")
-
+    """Background task that checks every user once per sweep interval, spread evenly across the interval"""
     try:
-        # Get all users with both wallet and threshold configured
-        users_with_settings = client.db.get_all_users_with_settings()
-        logger.info(f"Found {len(users_with_settings)} users to check")
-
-        for discord_id, wallet_address, threshold in users_with_settings:
-            try:
-                logger.info(f"Checking alerts for user {discord_id}")
-
-                # Get alerts for this user
-                tokens_meeting_threshold = await check_user_alerts(discord_id, wallet_address, threshold)
-
-                if tokens_meeting_threshold:
-                    # Get the Discord user object
-                    user = await client.fetch_user(discord_id)
-                    if user:
-                        try:
-                            # Send alerts via DM
-                            await user.send(
-                                f"🚨 **Price Alert!** Found {len(tokens_meeting_threshold)} tokens that meet your {threshold}% threshold:"
-                            )
-                            for token_card in tokens_meeting_threshold:
-                                await user.send(token_card)
-                            logger.info(f"Sent {len(tokens_meeting_threshold)} alerts to user {discord_id}")
-                        except discord.Forbidden:
-                            logger.warning(f"Cannot send DM to user {discord_id} - DMs might be disabled")
-                        except discord.HTTPException as e:
-                            logger.error(f"HTTP error sending DM to user {discord_id}: {e}")
-                    else:
-                        logger.warning(f"Could not find Discord user with ID {discord_id}")
-                else:
-                    logger.info(f"No tokens meeting threshold for user {discord_id}")
-
-            except Exception as e:
-                logger.error(f"Error checking alerts for user {discord_id}: {e}")
-                continue
+        now = time.time()
+
+        # Settings are read from memory, only changes made by other processes are fetched. Until the first load is
+        # complete every tick streams in more users, and the ones loaded so far are already checked
+        await client.registry.refresh(budget=SWEEP_TICK_SECONDS / 2)
+        subscribers = client.registry.subscribers()
+
+        if now - client.stats_logged_at >= client.sweep.interval:
+            client.stats_logged_at = now
+            logger.info(f"Found {len(subscribers)} users to check")
+
+            if client.dm.rate_limiter is not None:
+                logger.info(f"Birdeye rate limiter: {client.dm.rate_limiter.stats()}")
+            if client.planner.stream is not None:
+                logger.info(f"Birdeye price stream: {client.planner.stream.stats()}")
+
+        due = client.sweep.due(subscribers, now)
+        # Tokens moving towards a threshold are polled on their own schedule or streamed, holders they crossed it for go now
+        scheduled = {subscriber.discord_id for subscriber in due}
+        early = [
+            subscriber
+            for discord_id in await client.planner.early_holders()
+            if discord_id not in scheduled and (subscriber := client.registry.get(discord_id)) is not None
+        ]
+        checked = due + early
+        if not checked:
+            client.sweep.mark_done(due, now)
+            return
+
+        logger.info(f"Checking alerts for {len(due)} users, {len(early)} ahead of their slot")
+        try:
+            alerts_by_user = await client.planner.run(checked)
+            for subscriber in checked:
+                deliver_alerts(subscriber, alerts_by_user.get(subscriber.discord_id, []))
+        finally:
+            client.sweep.mark_done(due, now)
+
+        behind = client.sweep.behind_seconds
+        if behind > client.sweep.interval / 10:
+            logger.warning(f"Alert sweep is running {behind:.1f}s behind schedule")
+        else:
+            logger.info(f"Alert sweep is running {behind:.1f}s behind schedule")
 
     except Exception as e:
         logger.error(f"Error in automatic alerts task: {e}")
 
 
+def deliver_alerts(subscriber: Subscriber, token_alerts: List[TokenAlert]):
+    """Hand a user's alerts for this sweep to the delivery queue, DMs are sent in the background"""
+    if not token_alerts:
+        logger.info(f"No tokens meeting threshold for user {subscriber.discord_id}")
+        return
+    client.delivery.enqueue(DeliveryJob(subscriber.discord_id, subscriber.threshold, build_token_cards(token_alerts)))
+
+
+@tasks.loop(seconds=OUTBOX_POLL_SECONDS)
+async def deliver_pending_alerts():
+    """Gateway mode: queue the alerts that worker processes left in the outbox.
+
+    A row stays pending until its delivery finished, so alerts queued while this process was down or still in its
+    delivery queue when it stopped are sent after a restart, unless they are older than ``OUTBOX_MAX_AGE_SECONDS``
+    by then. The outbox holds the backlog, the in-memory queue is only topped up to ``OUTBOX_BATCH_SIZE`` alerts.
+    """
+    try:
+        now = time.time()
+        expired = await client.async_db.expire_alerts(now - OUTBOX_MAX_AGE_SECONDS, now, client.outbox_in_flight)
+        if expired:
+            ALERT_OUTBOX_EXPIRED.inc(expired)
+            logger.warning(f"Expired {expired} outbox alerts older than {OUTBOX_MAX_AGE_SECONDS:.0f}s instead of sending them")
+
+        if len(client.outbox_in_flight) < OUTBOX_BATCH_SIZE:
+            for row in await client.async_db.get_pending_alerts(now, limit=OUTBOX_BATCH_SIZE):
+                if row["id"] in client.outbox_in_flight or len(client.outbox_in_flight) >= OUTBOX_BATCH_SIZE:
+                    continue
+                client.outbox_in_flight.add(row["id"])
+                expires_at = row["created_at"] + OUTBOX_MAX_AGE_SECONDS
+                client.delivery.enqueue(
+                    DeliveryJob(row["discord_id"], row["threshold"], row["cards"], outbox_id=row["id"], attempts=row["attempts"], expires_at=expires_at)
+                )
+        ALERT_OUTBOX_PENDING.set(await client.async_db.count_pending_alerts())
+
+        if now - client.outbox_pruned_at >= 3600:
+            client.outbox_pruned_at = now
+            pruned = await client.async_db.prune_delivered_alerts(now - OUTBOX_RETENTION_SECONDS)
+            if pruned:
+                logger.info(f"Pruned {pruned} delivered alerts from the outbox")
+
+    except Exception as e:
+        logger.error(f"Error in pending alerts delivery task: {e}")
+
+
+@deliver_pending_alerts.before_loop
+async def before_deliver_pending_alerts():
+    await client.wait_until_ready()
+    logger.info("Bot is ready, delivering alerts computed by workers")
+
+
 @automatic_alerts.before_loop
 async def before_automatic_alerts():
     """Wait until the bot is ready before starting the task"""
@@ -91,11 +234,13 @@ async def before_automatic_alerts():
 
 
 @client.tree.command(name="setup", description="Setup user's wallet address and desired threshold")
-async def setup_user(interactions: discord.Interaction, wallet_address: str, threshold: float):
+@discord.app_commands.describe(window="Price change window the threshold applies to, 5m if not given")
+@discord.app_commands.choices(window=[discord.app_commands.Choice(name=window, value=window) for window in WINDOWS])
+async def setup_user(interactions: discord.Interaction, wallet_address: str, threshold: float, window: str = DEFAULT_WINDOW):
     try:
-        client.db.upsert_wallet(interactions.user.id, wallet_address)
+        await client.registry.upsert_wallet(interactions.user.id, wallet_address)
         logger.info(f"Upserted wallet address for user {interactions.user}!")
-        client.db.upsert_price_watch(interactions.user.id, threshold)
+        await client.registry.upsert_price_watch(interactions.user.id, threshold, window)
         logger.info(f"Upserted wallet threshold for user {interactions.user}!")
 
         await interactions.response.send_message("Setup complete! Now you can watch over tokens in your wallet!")
@@ -104,69 +249,12 @@ async def setup_user(interactions: discord.Interaction, wallet_address: str, thr
         await interactions.response.send_message(f"Error setting up wallet: {e}")
 
 
-async def check_user_alerts(discord_id: int, wallet_address: str, threshold: float):
+async def check_user_alerts(discord_id: int, wallet_address: str, threshold: float, window: str = DEFAULT_WINDOW):
     """Check alerts for a single user and return token cards that meet the threshold"""
     try:
-        all_users_tokens = client.dm.get_wallet_portfolio(wallet_address).items
-
-        if not all_users_tokens:
-            logger.info(f"No tokens found in wallet {wallet_address}")
-            return []
-
-        logger.info(f"Checking {len(all_users_tokens)} tokens for user {discord_id} with threshold {threshold}")
-
-        tokens_meeting_threshold = []
-
-        for token in all_users_tokens:
-            logger.info(f"Processing token: {token.address}")
-
-            if token.name in WRAPPED_TOKENS:
-                token.address = WRAPPED_TOKENS[token.name]
-
-            try:
-                token_overview = client.dm.get_token_overview(token.address)
-                price_change_5m = token_overview.priceChange5mPercent
-
-                if not price_change_5m:
-                    logger.info(f"Price change 5m is not available for {token.address}")
-                    continue
-            except DataManagerAPIError:
-                logger.error("Failed to fetch token overview!")
-                continue
-
-            if price_change_5m >= threshold:
-                try:
-                    creation_info = client.dm.get_token_creation_info(token.address)
-                    token_creation_time = creation_info.blockHumanTime
-                except DataManagerAPIError:
-                    logger.error("Failed to fetch token creation info!")
-                    token_creation_time = "-"
-
-                try:
-                    security = client.dm.get_token_security(token.address)
-                    no_mint = security.ownerOfOwnerAddress == "11111111111111111111111111111111"
-                    blacklist = security.fakeToken
-                except DataManagerAPIError:
-                    logger.error("Failed to fetch token security data!")
-                    no_mint = None
-                    blacklist = None
-
-                total_supply = token_overview.totalSupply
-                try:
-                    top_holders = client.dm.get_token_holders(token.address)
-                    top_10_holder_str = ""
-                    for holder in top_holders.items:
-                        top_10_holder_str += f" {holder.ui_amount / total_supply * 100:.2f}%" + " | "
-
-                except DataManagerAPIError:
-                    logger.error("Failed to fetch top 10 token holders!")
-                    top_10_holder_str = "-" + " | -" * 9
-
-                token_card = build_token_card(token, token_overview, token_creation_time, no_mint, blacklist, top_10_holder_str)
-
-                tokens_meeting_threshold.append(token_card)
-
-        return tokens_meeting_threshold
+        # An explicit /alert shows everything over the threshold, cooldowns only apply to the automatic DMs
+        alerts_by_user = await client.planner.run([Subscriber(discord_id, wallet_address, threshold, window)], apply_cooldown=False)
+        return build_token_cards(alerts_by_user.get(discord_id, []))
 
     except Exception as e:
         logger.error(f"Error occurred while checking alerts for user {discord_id}: {e}")
@@ -176,20 +264,20 @@ async def check_user_alerts(discord_id: int, wallet_address: str, threshold: flo
 @client.tree.command(name="alert", description="Get all tokens alert")
 async def alert(interactions: discord.Interaction):
     await interactions.response.defer()
+    # Someone is waiting on this one, let its Birdeye calls jump ahead of the background sweep
+    request_priority.set(Priority.INTERACTIVE)
 
     try:
         discord_id = interactions.user.id
-        wallet = client.db.get_wallet(discord_id)
-        price_watch = client.db.get_price_watch(discord_id)
-
-        if not wallet or not price_watch:
+        subscriber = await client.registry.fetch(discord_id)
+        if subscriber is None:
             await interactions.followup.send("Please setup your wallet and threshold first!")
             return
 
-        tokens_meeting_threshold = await check_user_alerts(discord_id, wallet.wallet_address, price_watch.threshold)
+        tokens_meeting_threshold = await check_user_alerts(discord_id, subscriber.wallet_address, subscriber.threshold, subscriber.window)
 
         if not tokens_meeting_threshold:
-            await interactions.followup.send(f"No tokens found that met threshold {price_watch.threshold}!")
+            await interactions.followup.send(f"No tokens found that met threshold {subscriber.threshold}!")
         else:
             await interactions.followup.send(f"Found {len(tokens_meeting_threshold)} tokens that meets your threshold!")
             for token_card in tokens_meeting_threshold:
@@ -199,98 +287,49 @@ async def alert(interactions: discord.Interaction):
         await interactions.followup.send(f"Error occurred while getting token alerts: {e}")
 
 
-def _fmt_usd(n):
-    try:
-        n = float(n)
-    except Exception:
-        return "-"
-    if n < 0:
-        sign, n = "-", -n
-    else:
-        sign = ""
-    if n >= 1_000_000_000:
-        return f"{sign}${n / 1_000_000_000:.2f}B"
-    if n >= 1_000_000:
-        return f"{sign}${n / 1_000_000:.2f}M"
-    if n >= 1_000:
-        return f"{sign}${n / 1_000:.2f}K"
-    return f"{sign}${n:,.2f}"
-
-
-def _fmt_price_with_zeroes(p):
-    try:
-        p = float(p)
-    except Exception:
-        return "-"
-    if p == 0:
-        return "$0.00"
-    if p >= 0.001:
-        s = f"${p:,.6f}".rstrip("0").rstrip(".")
-        return s
-    frac = f"{p:.18f}".split(".")[1].rstrip("0")
-    n0 = 0
-    for ch in frac:
-        if ch == "0":
-            n0 += 1
-        else:
-            break
-    tail = frac[n0 : n0 + 6] or "0"
-    return f"$0.0{{{n0}}}{tail}"
-
-
-def _yn(flag):
-    return "✅" if flag is True else ("❌" if flag is False else "—")
-
-
-def build_token_card(
-    token: WalletPortfolioItem,
-    token_overview: TokenOverviewResponse,
-    token_creation_time: str,
-    no_mint: Optional[bool] = None,
-    blacklist: Optional[bool] = None,
-    top_10_holders_str: str = None,
-    chain="Solana",
-):
-    liquidity = token_overview.liquidity
-    price = token_overview.price
-    token_symbol = token_overview.symbol or "Unknown"
-    market_cap = token_overview.marketCap
-    price_change_5m = token_overview.priceChange5mPercent
-
-    # Header
-    addr = token.address or "—"
-    header_left = f"${token_symbol} – {chain}"
-    header = f"{header_left}\n{addr}"
-
-    # Create
-    line_info_create = f"Creation Time: {token_creation_time}"
-
-    # MC, Liq, Price
-    line_info_mc = f"- MC: {_fmt_usd(market_cap)}"
-    line_info_liq = f"Liq: {_fmt_usd(liquidity)}"
-    line_info_px = f"Price: {_fmt_price_with_zeroes(price)} ({price_change_5m:+.2f}%)"
-
-    # Security
-    line_sec = f"NoMint {_yn(no_mint)} | Blacklist {_yn(blacklist)}"
-
-    card = (
-        f"""{header}
-
-📋 Info
-{line_info_create}
-{line_info_mc}
-{line_info_liq}
-{line_info_px}
-
-🛡️ Security
-{line_sec}
-
-💰 Top10 Holding
-{top_10_holders_str}
-"""
-    ).strip()
-
-    return card
+def format_stats() -> str:
+    lines = ["**Birdeye requests**"]
+    for (endpoint,) in BIRDEYE_REQUEST_SECONDS.label_values():
+        errors = BIRDEYE_REQUESTS.value(endpoint=endpoint, outcome="error")
+        calls = BIRDEYE_REQUESTS.value(endpoint=endpoint, outcome="ok") + errors
+        hits = BIRDEYE_CACHE_LOOKUPS.value(endpoint=endpoint, result="hit")
+        lookups = hits + BIRDEYE_CACHE_LOOKUPS.value(endpoint=endpoint, result="miss")
+        average = BIRDEYE_REQUEST_SECONDS.sum(endpoint=endpoint) / max(1, BIRDEYE_REQUEST_SECONDS.count(endpoint=endpoint))
+        p99 = BIRDEYE_REQUEST_SECONDS.quantile(0.99, endpoint=endpoint)
+        cache = f", {hits / lookups:.0%} cache hits" if lookups else ""
+        lines.append(f"`{endpoint}`: {calls:.0f} calls, {errors:.0f} errors{cache}, avg {average * 1000:.0f}ms, p99 <= {p99 * 1000:.0f}ms")
+
+    if client.dm.rate_limiter is not None:
+        lines.append(f"Rate limiter: {client.dm.rate_limiter.stats()}")
+
+    cycles = ALERT_CYCLE_SECONDS.count(mode="sweep")
+    average = ALERT_CYCLE_SECONDS.sum(mode="sweep") / max(1, cycles)
+    lines += [
+        "**Alert sweep**",
+        f"{cycles} cycles, avg {average:.2f}s, {client.sweep.behind_seconds:.1f}s behind schedule",
+        f"{ALERT_USERS_CHECKED.value(mode='sweep'):.0f} users and {ALERT_TOKENS_CHECKED.value(mode='sweep'):.0f} tokens checked, "
+        f"{ALERT_ALERTS.value(mode='sweep'):.0f} alerts, {ALERT_SUPPRESSED.value(mode='sweep'):.0f} suppressed by cooldown",
+        f"DMs: {ALERT_DMS.value(outcome='sent'):.0f} sent, {ALERT_DMS.value(outcome='forbidden'):.0f} forbidden, "
+        f"{ALERT_DMS.value(outcome='failed'):.0f} failed, {client.delivery.queue.qsize()} queued",
+    ]
+    if ALERT_MODE == "gateway":
+        # The sweep numbers above stay at zero here, workers report theirs on their own /metrics
+        lines.append(
+            f"Outbox: {ALERT_OUTBOX_PENDING.value():.0f} pending, {ALERT_OUTBOX_RETRIES.value():.0f} retried, "
+            f"{ALERT_OUTBOX_DROPPED.value():.0f} given up on, {ALERT_OUTBOX_EXPIRED.value():.0f} expired"
+        )
+    return "\n".join(lines)
+
+
+@client.tree.command(name="stats", description="Show Birdeye and alert sweep statistics (admins only)")
+@discord.app_commands.default_permissions(administrator=True)
+async def stats(interactions: discord.Interaction):
+    is_admin = interactions.guild is not None and interactions.permissions.administrator
+    if not is_admin and interactions.user.id not in ADMIN_DISCORD_IDS:
+        await interactions.response.send_message("Only bot admins can see the stats!", ephemeral=True)
+        return
+
+    await interactions.response.send_message(format_stats()[:2000], ephemeral=True)
 
 
 def run_bot():
@@ -0,0 +1,36 @@
+from typing import Optional
+import os
+
+from aiohttp import web
+
+from src.discord.logger import logger
+from src.monitoring.metrics import MetricsRegistry, metrics
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9108))
+
+
+async def start_metrics_server(
+    registry: MetricsRegistry = metrics, host: str = METRICS_HOST, port: int = METRICS_PORT
+) -> Optional[web.AppRunner]:
+    """Serve ``GET /metrics`` in Prometheus text format; a port of 0 turns it off. Returns the runner to clean up."""
+    if port <= 0:
+        return None
+
+    async def handle_metrics(request: web.Request) -> web.Response:
+        return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError as e:
+        # Several workers on one host cannot share the port, the first one serves it
+        logger.warning(f"Could not serve metrics on {host}:{port}: {e}")
+        await runner.cleanup()
+        return None
+
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,55 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Optional, Tuple
+import time
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    ttl: Optional[float]  # seconds, None means entries never expire
+    max_size: int
+
+
+class TTLCache:
+    """LRU cache where every entry also expires ``ttl`` seconds after it was stored"""
+
+    def __init__(self, ttl: Optional[float], max_size: int, clock: Callable[[], float] = time.monotonic) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[Optional[float], Any]]" = OrderedDict()
+
+    @classmethod
+    def from_policy(cls, policy: CachePolicy) -> "TTLCache":
+        return cls(ttl=policy.ttl, max_size=policy.max_size)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at is None or expires_at > self.clock():
+                self._entries.move_to_end(key)
+                return True, value
+            del self._entries[key]
+
+        return False, None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.max_size <= 0:
+            return
+
+        expires_at = None if self.ttl is None else self.clock() + self.ttl
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
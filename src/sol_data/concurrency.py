@@ -0,0 +1,20 @@
+from typing import Awaitable, Callable, Iterable, List, TypeVar, Union
+import asyncio
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+async def gather_bounded(fn: Callable[[T], Awaitable[R]], items: Iterable[T], limit: int) -> List[Union[R, BaseException]]:
+    """Run ``fn`` over ``items`` with at most ``limit`` calls in flight.
+
+    Results keep the order of ``items``. Exceptions are returned in place of results, like
+    ``asyncio.gather(return_exceptions=True)``, so one failing item never cancels the others.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(item: T) -> R:
+        async with semaphore:
+            return await fn(item)
+
+    return await asyncio.gather(*(run(item) for item in items), return_exceptions=True)
@@ -1,85 +1,448 @@
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
 from dotenv import load_dotenv
+import asyncio
+import json
 import os
-import requests
+import time
+import aiohttp
+from pydantic import BaseModel, ValidationError, create_model
 
+from src.monitoring.metrics import metrics
+from src.sol_data.cache import CachePolicy, TTLCache
+from src.sol_data.rate_limiter import Priority, PriorityRateLimiter, request_priority
+from src.sol_data.recorder import TrafficRecorder, TrafficReplayer, params_key
+from src.sol_data.resilience import CircuitBreaker, backoff_delay, parse_retry_after
+from src.sol_data.concurrency import gather_bounded
 from src.sol_data.data_models import (
+    MultiPriceResponse,
+    Price,
     TokenOverviewResponse,
     TokenSecurityResponse,
     TokenCreationInfoResponse,
     TokenHoldersResponse,
     WalletPortfolioResponse,
+    project_model,
 )
 
 load_dotenv()
 
 
 class DataManagerAPIError(RuntimeError):
-    pass
+    """A failed Birdeye call. ``retryable`` is set for failures worth another attempt: 429, 5xx and network errors."""
+
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None, retryable: bool = False) -> None:
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+        self.retryable = retryable
+
+
+class CircuitOpenError(DataManagerAPIError):
+    """Raised without calling Birdeye while the endpoint's circuit breaker is open"""
+
+
+def _retry_reason(error: DataManagerAPIError) -> str:
+    if error.status == 429:
+        return "rate_limited"
+    if error.status is not None:
+        return "server_error"
+    return "network"
+
+
+def _discard_result(task: "asyncio.Future[Any]") -> None:
+    if not task.cancelled():
+        task.exception()
+
+
+def _optional_ttl(name: str, default: Optional[float]) -> Optional[float]:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return None if value.lower() == "none" else float(value)
+
+
+# Creation info never changes, security rarely does, overview and holders are time-sensitive
+DEFAULT_CACHE_POLICIES: Dict[str, CachePolicy] = {
+    "/defi/token_overview": CachePolicy(
+        ttl=_optional_ttl("BIRDEYE_OVERVIEW_TTL", 60), max_size=int(os.getenv("BIRDEYE_OVERVIEW_CACHE_SIZE", 5_000))
+    ),
+    "/defi/token_creation_info": CachePolicy(
+        ttl=_optional_ttl("BIRDEYE_CREATION_INFO_TTL", None), max_size=int(os.getenv("BIRDEYE_CREATION_INFO_CACHE_SIZE", 50_000))
+    ),
+    "/defi/token_security": CachePolicy(
+        ttl=_optional_ttl("BIRDEYE_SECURITY_TTL", 6 * 60 * 60), max_size=int(os.getenv("BIRDEYE_SECURITY_CACHE_SIZE", 20_000))
+    ),
+    "/defi/v3/token/holder": CachePolicy(
+        ttl=_optional_ttl("BIRDEYE_HOLDERS_TTL", 60), max_size=int(os.getenv("BIRDEYE_HOLDERS_CACHE_SIZE", 5_000))
+    ),
+}
+
+
+BIRDEYE_REQUESTS = metrics.counter("birdeye_requests_total", "Birdeye HTTP requests by outcome", ["endpoint", "outcome"])
+BIRDEYE_REQUEST_SECONDS = metrics.histogram("birdeye_request_seconds", "Birdeye HTTP request latency", ["endpoint"])
+BIRDEYE_CACHE_LOOKUPS = metrics.counter("birdeye_cache_lookups_total", "Response cache lookups", ["endpoint", "result"])
+BIRDEYE_RATE_LIMIT_WAIT_SECONDS = metrics.histogram("birdeye_rate_limit_wait_seconds", "Time spent waiting for the rate limiter", ["priority"])
+BIRDEYE_RETRIES = metrics.counter("birdeye_retries_total", "Birdeye requests retried after a failed attempt", ["endpoint", "reason"])
+BIRDEYE_CIRCUIT_OPENED = metrics.counter("birdeye_circuit_opened_total", "Times an endpoint's circuit breaker opened", ["endpoint"])
+BIRDEYE_CIRCUIT_REJECTIONS = metrics.counter("birdeye_circuit_rejections_total", "Requests refused by an open circuit breaker", ["endpoint"])
+BIRDEYE_CIRCUIT_OPEN = metrics.gauge("birdeye_circuit_open", "1 while the endpoint's circuit breaker is open", ["endpoint"])
+BIRDEYE_COALESCED_REQUESTS = metrics.counter("birdeye_coalesced_requests_total", "Requests that joined an identical one already in flight", ["endpoint"])
+BIRDEYE_HEDGED_REQUESTS = metrics.counter("birdeye_hedged_requests_total", "Interactive requests that sent a hedge, by which copy answered first", ["endpoint", "winner"])
+
+
+@lru_cache(maxsize=None)
+def _envelope(model: Type[BaseModel]) -> Type[BaseModel]:
+    """Birdeye's response wrapper around ``model``, validated straight from the raw JSON bytes"""
+    return create_model(f"{model.__name__}Envelope", success=(bool, False), message=(Optional[str], None), data=(Optional[model], None))
 
 
 class DataManager:
-    def __init__(self, chain: str = "solana", base_url: str = "https://public-api.birdeye.so") -> None:
-        self.sess = requests.Session()
+    def __init__(
+        self,
+        chain: str = "solana",
+        base_url: str = "https://public-api.birdeye.so",
+        timeout: float = float(os.getenv("BIRDEYE_TIMEOUT", 10)),
+        connect_timeout: float = float(os.getenv("BIRDEYE_CONNECT_TIMEOUT", 5)),
+        max_connections: int = int(os.getenv("BIRDEYE_MAX_CONNECTIONS", 100)),
+        max_connections_per_host: int = int(os.getenv("BIRDEYE_MAX_CONNECTIONS_PER_HOST", 20)),
+        keepalive_timeout: float = float(os.getenv("BIRDEYE_KEEPALIVE_TIMEOUT", 30)),
+        cache_policies: Optional[Dict[str, CachePolicy]] = None,
+        rate_limit: float = float(os.getenv("BIRDEYE_RATE_LIMIT", 15)),
+        rate_burst: int = int(os.getenv("BIRDEYE_RATE_BURST", 15)),
+        record_path: Optional[str] = os.getenv("BIRDEYE_RECORD_PATH") or None,
+        replay_path: Optional[str] = os.getenv("BIRDEYE_REPLAY_PATH") or None,
+        replay_timing: str = os.getenv("BIRDEYE_REPLAY_TIMING", "fast"),
+        max_retries: int = int(os.getenv("BIRDEYE_MAX_RETRIES", 2)),
+        backoff_base: float = float(os.getenv("BIRDEYE_BACKOFF_BASE", 0.5)),
+        backoff_max: float = float(os.getenv("BIRDEYE_BACKOFF_MAX", 10)),
+        breaker_failures: int = int(os.getenv("BIRDEYE_BREAKER_FAILURES", 5)),
+        breaker_reset: float = float(os.getenv("BIRDEYE_BREAKER_RESET_SECONDS", 30)),
+        hedge_delay: float = float(os.getenv("BIRDEYE_HEDGE_DELAY", 0)),
+    ) -> None:
         self.base_url = base_url
-        self.headers = {"accept": "application/json", "X-API-KEY": os.getenv("BIRDEYE_API_KEY"), "x-chain": chain}
+        self.headers = {"accept": "application/json", "X-API-KEY": os.getenv("BIRDEYE_API_KEY") or "", "x-chain": chain}
+        self.timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=connect_timeout)
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.sess: Optional[aiohttp.ClientSession] = None
+
+        policies = DEFAULT_CACHE_POLICIES if cache_policies is None else cache_policies
+        self.caches: Dict[str, TTLCache] = {endpoint: TTLCache.from_policy(policy) for endpoint, policy in policies.items()}
+
+        # A non-positive rate turns the limiter off
+        self.rate_limiter = PriorityRateLimiter(rate_limit, rate_burst) if rate_limit > 0 else None
+
+        # Record real traffic to gzip JSONL, or answer every request from such a recording without calling Birdeye
+        self.recorder = TrafficRecorder(record_path) if record_path else None
+        self.replayer = TrafficReplayer(replay_path, replay_timing) if replay_path else None
+
+        # Failed GETs are retried with full jitter backoff, a Retry-After longer than ``backoff_max`` is not waited for
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # One breaker per endpoint, a non-positive failure count turns them off
+        self.breaker_failures = breaker_failures
+        self.breaker_reset = breaker_reset
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        # Interactive GETs still unanswered after ``hedge_delay`` seconds get a second copy, 0 turns hedging off
+        self.hedge_delay = hedge_delay
+        self._in_flight: Dict[Tuple[Any, ...], "asyncio.Task[Any]"] = {}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """The session is created lazily so it binds to the running event loop"""
+        if self.sess is None or self.sess.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self.sess = aiohttp.ClientSession(connector=connector, headers=self.headers, timeout=self.timeout)
+        return self.sess
+
+    async def close(self) -> None:
+        if self.sess is not None and not self.sess.closed:
+            await self.sess.close()
+        if self.recorder is not None:
+            self.recorder.close()
 
-    def make_request(self, method: str, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
-        url = f"{self.base_url}/{endpoint}"
-        r = self.sess.request(method=method, url=url, params=params, headers=self.headers)
+    async def make_request(self, method: str, endpoint: str, params: Dict[str, Any], model: Optional[Type[BaseModel]] = None) -> Any:
+        """The response's ``data`` as decoded JSON, or validated as ``model`` when one is given"""
+        cache = self.caches.get(endpoint) if method == "GET" else None
+        if cache is not None:
+            cache_key = (model, params_key(params))
+            hit, data = cache.get(cache_key)
+            BIRDEYE_CACHE_LOOKUPS.inc(endpoint=endpoint, result="hit" if hit else "miss")
+            if hit:
+                return data
 
-        if r.status_code != 200:
-            raise DataManagerAPIError(f"{r.status_code} {r.reason}: {r.text}")
+        if method not in ("GET", "HEAD"):
+            return await self._request(method, endpoint, params, model)
 
-        data = r.json()
+        # Single-flight: concurrent callers asking for the same thing share one request and its result or error
+        key = (method, endpoint, model, params_key(params))
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._request(method, endpoint, params, model))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._request_done(key, done))
+        else:
+            BIRDEYE_COALESCED_REQUESTS.inc(endpoint=endpoint)
+        # Shielded so a caller giving up does not cancel the request for everyone else waiting on it
+        return await asyncio.shield(task)
+
+    def _request_done(self, key: Tuple[Any, ...], task: "asyncio.Task[Any]") -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every caller was cancelled before it finished
+
+    async def _request(self, method: str, endpoint: str, params: Dict[str, Any], model: Optional[Type[BaseModel]]) -> Any:
+        """A request with retries and the circuit breaker, the result is cached when the endpoint has a cache"""
+        idempotent = method in ("GET", "HEAD")
+        hedge = idempotent and self.hedge_delay > 0 and self.replayer is None and request_priority.get() is Priority.INTERACTIVE
+        breaker = self._get_breaker(endpoint)
+        attempt = 0
+        while True:
+            if breaker is not None and not breaker.allow():
+                BIRDEYE_CIRCUIT_REJECTIONS.inc(endpoint=endpoint)
+                raise CircuitOpenError(f"Circuit breaker for {endpoint} is open after repeated failures")
+            try:
+                if hedge:
+                    data = await self._hedged_attempt(method, endpoint, params, model)
+                else:
+                    data = await self._attempt(method, endpoint, params, model)
+            except DataManagerAPIError as e:
+                opened = False
+                if breaker is not None:
+                    if not e.retryable:
+                        # Birdeye answered, the request itself was bad
+                        breaker.record_success()
+                        BIRDEYE_CIRCUIT_OPEN.set(0, endpoint=endpoint)
+                    elif breaker.record_failure():
+                        opened = True
+                        BIRDEYE_CIRCUIT_OPENED.inc(endpoint=endpoint)
+                        BIRDEYE_CIRCUIT_OPEN.set(1, endpoint=endpoint)
+                if opened or not (e.retryable and idempotent) or attempt >= self.max_retries:
+                    raise
+                if e.retry_after is not None and e.retry_after > self.backoff_max:
+                    raise
+                delay = max(backoff_delay(attempt, self.backoff_base, self.backoff_max), e.retry_after or 0.0)
+                BIRDEYE_RETRIES.inc(endpoint=endpoint, reason=_retry_reason(e))
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled mid-request: let the next caller be the half-open trial instead
+                if breaker is not None:
+                    breaker.release()
+                raise
+            break
+
+        if breaker is not None:
+            breaker.record_success()
+            BIRDEYE_CIRCUIT_OPEN.set(0, endpoint=endpoint)
+        cache = self.caches.get(endpoint) if method == "GET" else None
+        if cache is not None:
+            cache.set((model, params_key(params)), data)
+        return data
+
+    def _get_breaker(self, endpoint: str) -> Optional[CircuitBreaker]:
+        if self.breaker_failures <= 0:
+            return None
+        breaker = self.breakers.get(endpoint)
+        if breaker is None:
+            breaker = self.breakers[endpoint] = CircuitBreaker(self.breaker_failures, self.breaker_reset)
+        return breaker
+
+    async def _attempt(self, method: str, endpoint: str, params: Dict[str, Any], model: Optional[Type[BaseModel]]) -> Any:
+        """One rate limited, timed and counted request"""
+        if self.rate_limiter is not None:
+            priority = request_priority.get()
+            waited_from = time.perf_counter()
+            await self.rate_limiter.acquire(priority)
+            BIRDEYE_RATE_LIMIT_WAIT_SECONDS.observe(time.perf_counter() - waited_from, priority=priority.name.lower())
+
+        started = time.perf_counter()
+        try:
+            data = await self._fetch(method, endpoint, params, model)
+        except DataManagerAPIError:
+            BIRDEYE_REQUESTS.inc(endpoint=endpoint, outcome="error")
+            raise
+        finally:
+            BIRDEYE_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+        BIRDEYE_REQUESTS.inc(endpoint=endpoint, outcome="ok")
+        return data
+
+    async def _hedged_attempt(self, method: str, endpoint: str, params: Dict[str, Any], model: Optional[Type[BaseModel]]) -> Any:
+        """Like ``_attempt``, but sends a second copy if the first has not answered within ``hedge_delay``.
+
+        The first successful answer wins and the other copy is cancelled; if both fail the primary's error is raised.
+        """
+        primary = asyncio.ensure_future(self._attempt(method, endpoint, params, model))
+        copies = {primary: "primary"}
+        try:
+            try:
+                done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay)
+            except asyncio.CancelledError:
+                # The caller gave up, the copy must not keep spending a rate limiter token on its behalf
+                primary.cancel()
+                raise
+            if done:
+                return primary.result()
+
+            copies[asyncio.ensure_future(self._attempt(method, endpoint, params, model))] = "hedge"
+            pending = set(copies)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        BIRDEYE_HEDGED_REQUESTS.inc(endpoint=endpoint, winner=copies[task])
+                        return task.result()
+            BIRDEYE_HEDGED_REQUESTS.inc(endpoint=endpoint, winner="none")
+            return primary.result()
+        finally:
+            for task in copies:
+                task.cancel()
+                # The losing copy may still fail before the cancellation lands, nobody else looks at its error
+                task.add_done_callback(_discard_result)
+
+    async def _send(self, method: str, endpoint: str, params: Dict[str, Any]) -> Tuple[int, str, bytes, Optional[float]]:
+        """Raw (status, reason, body, retry_after) of a request, from Birdeye or from the recording being replayed"""
+        if self.replayer is not None:
+            response = await self.replayer.respond(method, endpoint, params)
+            if response is None:
+                raise DataManagerAPIError(f"No recorded response for {method} {endpoint} {params}")
+            return response
+
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        started_at, started = time.time(), time.perf_counter()
+        try:
+            async with self._get_session().request(method=method, url=url, params=params) as r:
+                status, reason, body = r.status, r.reason or "", await r.read()
+                retry_after = parse_retry_after(r.headers.get("Retry-After"))
+        except (aiohttp.ClientError, TimeoutError) as e:
+            raise DataManagerAPIError(f"Request to {endpoint} failed: {e!r}", retryable=True) from e
+
+        if self.recorder is not None:
+            self.recorder.record(method, endpoint, params, status, reason, body, started_at, time.perf_counter() - started, retry_after)
+        return status, reason, body, retry_after
+
+    async def _fetch(self, method: str, endpoint: str, params: Dict[str, Any], model: Optional[Type[BaseModel]] = None) -> Any:
+        status, reason, body, retry_after = await self._send(method, endpoint, params)
+        if status != 200:
+            raise DataManagerAPIError(
+                f"{status} {reason}: {body.decode('utf-8', errors='replace')}",
+                status=status,
+                retry_after=retry_after,
+                retryable=status == 429 or status >= 500,
+            )
+
+        if model is not None:
+            # pydantic-core parses the bytes itself and only builds the fields ``model`` declares
+            try:
+                envelope = _envelope(model).model_validate_json(body)
+            except ValidationError as e:
+                raise DataManagerAPIError(f"Unexpected response from {endpoint}: {e}") from e
+            if not envelope.success:
+                raise DataManagerAPIError(f"Error fetching data from Birdeye: {envelope.message}")
+            return envelope.data
+
+        try:
+            data = json.loads(body)
+        except ValueError as e:
+            raise DataManagerAPIError(f"Unexpected response from {endpoint}: {e}") from e
 
         if not data.get("success"):
             raise DataManagerAPIError(f"Error fetching data from Birdeye: {data.get('message')}")
 
         return data.get("data")
 
-    def get_token_overview(self, token_address: str, frames: Optional[List[str]] = None) -> TokenOverviewResponse:
+    async def get_token_overview(
+        self, token_address: str, frames: Optional[List[str]] = None, fields: Optional[Iterable[str]] = None
+    ) -> TokenOverviewResponse:
+        """GET /defi/token_overview.
+
+        With ``fields``, only those fields are decoded and validated and the result is a projection of
+        TokenOverviewResponse carrying just them; without, the full model is returned.
+        """
         params = {"address": token_address}
 
         if frames:
-            params["frames"] = frames
+            params["frames"] = ",".join(frames)
+
+        if fields is not None:
+            model = project_model(TokenOverviewResponse, frozenset(fields))
+            overview = await self.make_request("GET", "/defi/token_overview", params=params, model=model)
+            return overview if overview is not None else model()
 
-        data = self.make_request("GET", "/defi/token_overview", params=params)
+        data = await self.make_request("GET", "/defi/token_overview", params=params)
 
         if not data:
             return TokenOverviewResponse()
 
         return TokenOverviewResponse(**data)
 
-    def get_wallet_portfolio(self, wallet_address: str) -> WalletPortfolioResponse:
-        data = self.make_request("GET", "/v1/wallet/token_list", params={"wallet": wallet_address})
+    async def get_multi_price(
+        self, token_addresses: List[str], chunk_size: int = 100, include_liquidity: bool = True, max_concurrency: int = 4
+    ) -> MultiPriceResponse:
+        """GET /defi/multi_price, split into chunks of at most 100 addresses per request.
+
+        Tokens Birdeye cannot price are left out of the result. A failed chunk raises DataManagerAPIError.
+        """
+        chunk_size = min(chunk_size, 100)
+        chunks = [token_addresses[i : i + chunk_size] for i in range(0, len(token_addresses), chunk_size)]
+
+        async def fetch_chunk(chunk: List[str]) -> Dict[str, Any]:
+            params = {"list_address": ",".join(chunk)}
+            if include_liquidity:
+                params["include_liquidity"] = "true"
+            return await self.make_request("GET", "/defi/multi_price", params=params)
+
+        prices: Dict[str, Price] = {}
+        for data in await gather_bounded(fetch_chunk, chunks, max_concurrency):
+            if isinstance(data, BaseException):
+                raise data
+            for address, price in (data or {}).items():
+                if not price:
+                    continue
+                try:
+                    prices[address] = Price(**price)
+                except ValidationError:
+                    continue
+
+        return MultiPriceResponse(prices)
+
+    async def get_wallet_portfolio(self, wallet_address: str) -> WalletPortfolioResponse:
+        data = await self.make_request("GET", "/v1/wallet/token_list", params={"wallet": wallet_address})
 
         if not data:
             return WalletPortfolioResponse()
 
         return WalletPortfolioResponse(**data)
 
-    def get_token_security(self, address: str) -> TokenSecurityResponse:
+    async def get_token_security(self, address: str) -> TokenSecurityResponse:
         """GET /defi/token_security"""
-        data = self.make_request("GET", "/defi/token_security", params={"address": address})
+        data = await self.make_request("GET", "/defi/token_security", params={"address": address})
         if not data:
             return TokenSecurityResponse()
         return TokenSecurityResponse(**data)
 
-    def get_token_creation_info(self, address: str) -> TokenCreationInfoResponse:
-        data = self.make_request("GET", "/defi/token_creation_info", params={"address": address})
+    async def get_token_creation_info(self, address: str) -> TokenCreationInfoResponse:
+        data = await self.make_request("GET", "/defi/token_creation_info", params={"address": address})
         if not data:
             return TokenCreationInfoResponse()
         return TokenCreationInfoResponse(**data)
 
-    def get_token_holders(
+    async def get_token_holders(
         self,
         address: str,
         offset: int = 0,
         limit: int = 10,
         ui_amount_mode: str = "scaled",
     ) -> TokenHoldersResponse:
-        data = self.make_request(
+        data = await self.make_request(
             "GET",
             "/defi/v3/token/holder",
             params={
@@ -92,4 +455,4 @@ class DataManager:
         if not data:
             return TokenHoldersResponse()
 
-        return TokenHoldersResponse(**data)
\ No newline at end of file
+        return TokenHoldersResponse(**data)
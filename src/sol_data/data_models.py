@@ -1,5 +1,6 @@
-from pydantic import BaseModel, RootModel
-from typing import Optional, List, Dict
+from functools import lru_cache
+from pydantic import BaseModel, RootModel, create_model
+from typing import FrozenSet, Optional, List, Dict, Type
 
 
 # https://docs.birdeye.so/reference/get-defi-multi_price
@@ -373,3 +374,16 @@ class WalletPortfolioItem(BaseModel):
 
 class WalletPortfolioResponse(BaseModel):
     items: List[WalletPortfolioItem] = []
+
+
+@lru_cache(maxsize=None)
+def project_model(model: Type[BaseModel], fields: FrozenSet[str]) -> Type[BaseModel]:
+    """Copy of ``model`` with only ``fields``, so validating a response skips everything the caller does not read"""
+    unknown = fields - model.model_fields.keys()
+    if unknown:
+        raise ValueError(f"{model.__name__} has no fields {sorted(unknown)}")
+
+    return create_model(
+        f"{model.__name__}Projection",
+        **{name: (info.annotation, info) for name, info in model.model_fields.items() if name in fields},
+    )
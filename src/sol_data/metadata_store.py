@@ -0,0 +1,106 @@
+from typing import Dict, List, Optional
+import os
+import time
+
+from src.db.calls import db_call
+from src.db.database import DatabaseConnection
+from src.discord.logger import logger
+from src.sol_data.concurrency import gather_bounded
+from src.sol_data.data_manager import DataManager
+from src.sol_data.data_models import TokenCreationInfoResponse, TokenSecurityResponse
+
+
+class TokenMetadataStore:
+    """Read-through store for token metadata that rarely or never changes.
+
+    Lookups are answered from the database in one bulk query; only the misses go to Birdeye and are
+    written back, so a restarted bot does not have to refetch everything it has already seen.
+    Without a database it simply fetches from Birdeye.
+    """
+
+    def __init__(
+        self,
+        dm: DataManager,
+        db: Optional[DatabaseConnection] = None,
+        security_max_age: float = float(os.getenv("TOKEN_SECURITY_MAX_AGE", 24 * 60 * 60)),
+        max_concurrency: int = int(os.getenv("ALERT_MAX_CONCURRENCY", 10)),
+    ) -> None:
+        self.dm = dm
+        self.db = db
+        self.security_max_age = security_max_age
+        self.max_concurrency = max_concurrency
+
+    async def get_creation_infos(self, token_addresses: List[str]) -> Dict[str, TokenCreationInfoResponse]:
+        """Creation info for every address that could be resolved, failures are left out"""
+        infos: Dict[str, TokenCreationInfoResponse] = {}
+
+        if self.db is not None:
+            stored = await db_call(self.db.get_token_creation_infos, token_addresses, default={}, source="Token metadata store")
+            for address, row in stored.items():
+                infos[address] = TokenCreationInfoResponse(
+                    txHash=row["tx_hash"],
+                    slot=row["slot"],
+                    tokenAddress=row["token_address"],
+                    decimals=row["decimals"],
+                    owner=row["owner"],
+                    blockUnixTime=row["block_unix_time"],
+                    blockHumanTime=row["block_human_time"],
+                )
+
+        missing = [address for address in token_addresses if address not in infos]
+        results = await gather_bounded(self.dm.get_token_creation_info, missing, self.max_concurrency)
+        fetched = []
+        for address, result in zip(missing, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Failed to fetch token creation info! {result!r}")
+                continue
+            infos[address] = result
+            fetched.append(address)
+
+        if self.db is not None and fetched:
+            rows = [
+                {
+                    "token_address": address,
+                    "tx_hash": infos[address].txHash,
+                    "slot": infos[address].slot,
+                    "decimals": infos[address].decimals,
+                    "owner": infos[address].owner,
+                    "block_unix_time": infos[address].blockUnixTime,
+                    "block_human_time": infos[address].blockHumanTime,
+                }
+                for address in fetched
+                if infos[address].blockUnixTime is not None  # an empty response is not worth keeping forever
+            ]
+            await db_call(self.db.upsert_token_creation_infos, rows, source="Token metadata store")
+
+        return infos
+
+    async def get_securities(self, token_addresses: List[str]) -> Dict[str, TokenSecurityResponse]:
+        """Security data for every address that could be resolved, failures are left out"""
+        securities: Dict[str, TokenSecurityResponse] = {}
+
+        if self.db is not None:
+            updated_after = int(time.time() - self.security_max_age)
+            stored = await db_call(self.db.get_token_securities, token_addresses, updated_after, default={}, source="Token metadata store")
+            for address, data in stored.items():
+                securities[address] = TokenSecurityResponse(**data)
+
+        missing = [address for address in token_addresses if address not in securities]
+        results = await gather_bounded(self.dm.get_token_security, missing, self.max_concurrency)
+        fetched = []
+        for address, result in zip(missing, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Failed to fetch token security data! {result!r}")
+                continue
+            securities[address] = result
+            fetched.append(address)
+
+        if self.db is not None and fetched:
+            now = int(time.time())
+            rows = [
+                {"token_address": address, "data": securities[address].model_dump(mode="json"), "updated_at": now}
+                for address in fetched
+            ]
+            await db_call(self.db.upsert_token_securities, rows, source="Token metadata store")
+
+        return securities
@@ -0,0 +1,165 @@
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import os
+import time
+
+from src.sol_data.data_models import TokenOverviewResponse
+
+# Change windows a user can pick in /setup, in seconds
+WINDOWS: Dict[str, int] = {"1m": 60, "5m": 5 * 60, "30m": 30 * 60, "1h": 60 * 60}
+DEFAULT_WINDOW = "5m"
+
+
+class PriceHistory:
+    """Recent price samples of many tokens in fixed-size ring buffers.
+
+    All tokens share two flat arrays, unix seconds as uint32 and prices as float32, with ``samples`` slots per
+    token, so a sample costs 8 bytes and no Python object. A sample in the same ``resolution`` second bucket as the
+    newest one replaces it, which keeps at least ``samples * resolution`` seconds of history however often a token
+    is priced. Beyond ``max_tokens`` the least recently priced token gives up its slots.
+    """
+
+    def __init__(
+        self,
+        samples: int = int(os.getenv("PRICE_HISTORY_SAMPLES", 72)),
+        resolution: int = int(os.getenv("PRICE_HISTORY_RESOLUTION", 60)),
+        max_tokens: int = int(os.getenv("PRICE_HISTORY_MAX_TOKENS", 100_000)),
+    ) -> None:
+        if samples < 2 or resolution < 1 or max_tokens < 1:
+            raise ValueError("samples must be at least 2, resolution and max_tokens at least 1")
+        self.samples = samples
+        self.resolution = resolution
+        self.max_tokens = max_tokens
+        self._times = array("I")
+        self._prices = array("f")
+        self._heads = array("l")  # per slot, position of the newest sample
+        self._counts = array("l")
+        self._slots: "OrderedDict[str, int]" = OrderedDict()  # least recently priced first
+        self._free: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, address: str) -> bool:
+        return address in self._slots
+
+    def nbytes(self) -> int:
+        """Memory held by the sample arrays"""
+        return sum(buffer.itemsize * len(buffer) for buffer in (self._times, self._prices, self._heads, self._counts))
+
+    def _allocate(self, address: str) -> int:
+        if len(self._slots) >= self.max_tokens:
+            _, slot = self._slots.popitem(last=False)
+        elif self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self._counts)
+            self._times.frombytes(bytes(self._times.itemsize * self.samples))
+            self._prices.frombytes(bytes(self._prices.itemsize * self.samples))
+            self._heads.append(0)
+            self._counts.append(0)
+        self._counts[slot] = 0
+        self._slots[address] = slot
+        return slot
+
+    def forget(self, address: str) -> None:
+        slot = self._slots.pop(address, None)
+        if slot is not None:
+            self._free.append(slot)
+
+    def record(self, address: str, price: Optional[float], at: Optional[float] = None) -> None:
+        """Add a price sample; non-positive prices and samples older than the newest one are ignored"""
+        if not price or price <= 0:
+            return
+
+        at = int(time.time() if at is None else at)
+        slot = self._slots.get(address)
+        if slot is None:
+            slot = self._allocate(address)
+        else:
+            self._slots.move_to_end(address)
+
+        base, count, head = slot * self.samples, self._counts[slot], self._heads[slot]
+        if count:
+            newest = self._times[base + head]
+            if at < newest:
+                return
+            if at // self.resolution != newest // self.resolution:
+                head = (head + 1) % self.samples
+                count = min(count + 1, self.samples)
+        else:
+            head, count = 0, 1
+
+        self._times[base + head] = at
+        self._prices[base + head] = price
+        self._heads[slot] = head
+        self._counts[slot] = count
+
+    def observe_overview(self, address: str, overview: TokenOverviewResponse, at: Optional[float] = None) -> None:
+        """Record an overview's price; a token with at most one sample so far is seeded from its history prices"""
+        at = time.time() if at is None else at
+        slot = self._slots.get(address)
+        if slot is None or self._counts[slot] < 2:
+            latest = self.latest(address)
+            self.forget(address)
+            for seconds, price in ((3600, overview.history1hPrice), (1800, overview.history30mPrice), (300, overview.history5mPrice), (60, overview.history1mPrice)):
+                self.record(address, price, at - seconds)
+            if latest is not None:
+                self.record(address, latest[1], latest[0])
+        self.record(address, overview.price, at)
+
+    def latest(self, address: str) -> Optional[Tuple[int, float]]:
+        """(unix seconds, price) of the newest sample"""
+        slot = self._slots.get(address)
+        if slot is None or not self._counts[slot]:
+            return None
+        position = slot * self.samples + self._heads[slot]
+        return self._times[position], self._prices[position]
+
+    def reference(self, address: str, at: float, tolerance: float, skip_newest: bool = False) -> Optional[float]:
+        """Price of the sample closest to ``at``, None without one within ``tolerance`` seconds"""
+        slot = self._slots.get(address)
+        if slot is None:
+            return None
+
+        base, head = slot * self.samples, self._heads[slot]
+        best, best_distance = None, tolerance
+        for back in range(1 if skip_newest else 0, self._counts[slot]):
+            position = base + (head - back) % self.samples
+            distance = abs(self._times[position] - at)
+            if distance <= best_distance:
+                best, best_distance = self._prices[position], distance
+            elif self._times[position] < at:
+                break  # samples only get older from here
+        return best
+
+    def change_since(self, address: str, seconds: float, at: float) -> Optional[float]:
+        """Percent change of the newest price against the price in effect ``seconds`` before ``at``.
+
+        Meant for streamed tokens, where every trade is recorded and a price holds until the next sample, so a token
+        that has not traded is flat rather than unknown. None when the history does not reach back that far.
+        """
+        slot = self._slots.get(address)
+        if slot is None or not self._counts[slot]:
+            return None
+
+        base, head, start = slot * self.samples, self._heads[slot], at - seconds
+        price = self._prices[base + head]
+        for back in range(self._counts[slot]):
+            position = base + (head - back) % self.samples
+            if self._times[position] <= start:
+                reference = self._prices[position]
+                return (price - reference) / reference * 100
+        return None
+
+    def change(self, address: str, seconds: float) -> Optional[float]:
+        """Percent change of the newest price over the last ``seconds``, None without a sample near the window start"""
+        newest = self.latest(address)
+        if newest is None:
+            return None
+        at, price = newest
+        reference = self.reference(address, at - seconds, tolerance=max(self.resolution, seconds / 5), skip_newest=True)
+        if reference is None:
+            return None
+        return (price - reference) / reference * 100
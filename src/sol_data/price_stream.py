@@ -0,0 +1,234 @@
+from typing import Callable, Dict, Iterable, Optional, Set
+from dotenv import load_dotenv
+import asyncio
+import json
+import os
+import time
+import aiohttp
+
+from src.discord.logger import logger
+from src.monitoring.metrics import metrics
+from src.sol_data.resilience import backoff_delay
+
+load_dotenv()
+
+PRICE_STREAM_CONNECTIONS = metrics.gauge("birdeye_stream_connections", "Open Birdeye price stream connections")
+PRICE_STREAM_TOKENS = metrics.gauge("birdeye_stream_tokens", "Tokens subscribed on open Birdeye price stream connections")
+PRICE_STREAM_MESSAGES = metrics.counter("birdeye_stream_messages_total", "Birdeye price stream messages received", ["type"])
+PRICE_STREAM_RECONNECTS = metrics.counter("birdeye_stream_reconnects_total", "Birdeye price stream connections lost and retried")
+
+
+class _Connection:
+    def __init__(self, number: int) -> None:
+        self.number = number
+        self.addresses: Set[str] = set()  # what this connection should be subscribed to
+        self.subscribed: Set[str] = set()  # what the server was last asked for on the open socket
+        self.ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self.task: Optional["asyncio.Task[None]"] = None
+        self.lock = asyncio.Lock()
+
+    @property
+    def open(self) -> bool:
+        return self.ws is not None and not self.ws.closed
+
+
+class PriceStream:
+    """Birdeye websocket price feed for a changing set of tokens.
+
+    A connection takes at most ``tokens_per_connection`` addresses in one complex SUBSCRIBE_PRICE query, so tokens
+    are spread over up to ``max_connections`` sockets; ``update`` moves only the changed addresses and resubscribes
+    only the connections they belong to. Every PRICE_DATA message calls ``on_price(address, price, at)``.
+
+    A token is ``live`` while its connection is open and subscribed to it. Tokens over capacity and tokens of a
+    dropped connection are not live, callers keep polling those until the connection is back. Dropped connections
+    reconnect with jittered backoff and resubscribe to their current addresses.
+    """
+
+    def __init__(
+        self,
+        on_price: Callable[[str, float, float], None],
+        url: str = os.getenv("BIRDEYE_WS_URL", "wss://public-api.birdeye.so/socket/solana"),
+        tokens_per_connection: int = int(os.getenv("BIRDEYE_WS_TOKENS_PER_CONNECTION", 100)),
+        max_connections: int = int(os.getenv("BIRDEYE_WS_MAX_CONNECTIONS", 5)),
+        chart_type: str = "1m",
+        heartbeat: float = 30.0,
+        backoff_base: float = float(os.getenv("BIRDEYE_BACKOFF_BASE", 0.5)),
+        backoff_max: float = float(os.getenv("BIRDEYE_BACKOFF_MAX", 10)),
+    ) -> None:
+        self.on_price = on_price
+        self.url = url
+        self.api_key = os.getenv("BIRDEYE_API_KEY") or ""
+        self.tokens_per_connection = tokens_per_connection
+        self.chart_type = chart_type
+        # Pings on this interval close a socket that stopped answering, so a silent stall also falls back to polling
+        self.heartbeat = heartbeat
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.connections = [_Connection(number) for number in range(max_connections)]
+        self._owner: Dict[str, _Connection] = {}
+        self.sess: Optional[aiohttp.ClientSession] = None
+        self._started = False
+        self._overflow = 0
+        self._subscribing: Set["asyncio.Task[None]"] = set()
+
+    @property
+    def capacity(self) -> int:
+        return self.tokens_per_connection * len(self.connections)
+
+    def live(self, address: str) -> bool:
+        connection = self._owner.get(address)
+        return connection is not None and connection.open and address in connection.subscribed
+
+    def live_tokens(self) -> int:
+        return sum(len(connection.subscribed) for connection in self.connections if connection.open)
+
+    def start(self) -> None:
+        """Connections are opened once they have addresses, from then on ``update`` keeps them subscribed"""
+        self._started = True
+        for connection in self.connections:
+            if connection.addresses:
+                self._ensure_running(connection)
+
+    async def stop(self) -> None:
+        self._started = False
+        tasks = [connection.task for connection in self.connections if connection.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.sess is not None and not self.sess.closed:
+            await self.sess.close()
+        PRICE_STREAM_CONNECTIONS.set(0)
+        PRICE_STREAM_TOKENS.set(0)
+
+    def update(self, addresses: Iterable[str]) -> None:
+        """Stream exactly ``addresses``, as far as capacity allows"""
+        wanted = set(addresses)
+        changed: Set[_Connection] = set()
+        for address in [address for address in self._owner if address not in wanted]:
+            connection = self._owner.pop(address)
+            connection.addresses.discard(address)
+            changed.add(connection)
+
+        free = [connection for connection in self.connections if len(connection.addresses) < self.tokens_per_connection]
+        for address in wanted:
+            if address in self._owner:
+                continue
+            while free and len(free[0].addresses) >= self.tokens_per_connection:
+                free.pop(0)
+            if not free:
+                break
+            free[0].addresses.add(address)
+            self._owner[address] = free[0]
+            changed.add(free[0])
+
+        overflow = len(wanted) - len(self._owner)
+        if overflow != self._overflow:
+            self._overflow = overflow
+            if overflow:
+                logger.warning(f"Price stream is full at {self.capacity} tokens, {overflow} are left to polling")
+
+        for connection in changed:
+            if self._started:
+                self._ensure_running(connection)
+            if connection.open:
+                task = asyncio.create_task(self._subscribe(connection))
+                self._subscribing.add(task)
+                task.add_done_callback(self._subscribing.discard)
+
+    def _ensure_running(self, connection: _Connection) -> None:
+        if connection.task is None or connection.task.done():
+            connection.task = asyncio.create_task(self._run_connection(connection))
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self.sess is None or self.sess.closed:
+            self.sess = aiohttp.ClientSession()
+        return self.sess
+
+    def _query(self, addresses: Iterable[str]) -> str:
+        return " OR ".join(f"(address = {address} AND chartType = {self.chart_type} AND currency = usd)" for address in sorted(addresses))
+
+    async def _subscribe(self, connection: _Connection) -> None:
+        """Replace the socket's subscription with the connection's current addresses"""
+        async with connection.lock:
+            if not connection.open or connection.subscribed == connection.addresses:
+                return
+            addresses = set(connection.addresses)
+            try:
+                await connection.ws.send_json({"type": "UNSUBSCRIBE_PRICE"})
+                if addresses:
+                    await connection.ws.send_json({"type": "SUBSCRIBE_PRICE", "data": {"queryType": "complex", "query": self._query(addresses)}})
+            except (aiohttp.ClientError, ConnectionError) as e:
+                logger.error(f"Price stream connection {connection.number} failed to subscribe: {e!r}")
+                return
+            connection.subscribed = addresses
+            PRICE_STREAM_TOKENS.set(self.live_tokens())
+
+    def _handle(self, connection: _Connection, data: str) -> None:
+        try:
+            message = json.loads(data)
+        except ValueError:
+            PRICE_STREAM_MESSAGES.inc(type="invalid")
+            return
+
+        kind = message.get("type") or "unknown"
+        PRICE_STREAM_MESSAGES.inc(type=kind)
+        if kind == "PRICE_DATA":
+            payload = message.get("data") or {}
+            address, price = payload.get("address"), payload.get("c")
+            if address and isinstance(price, (int, float)) and price > 0:
+                # unixTime is the candle's start, the close is the price as of now
+                self.on_price(address, float(price), time.time())
+        elif kind == "ERROR":
+            # Most likely the subscription was refused; its tokens are polled until the next subscribe goes through
+            logger.error(f"Price stream connection {connection.number} error: {message.get('data')}")
+            connection.subscribed = set()
+            PRICE_STREAM_TOKENS.set(self.live_tokens())
+
+    async def _run_connection(self, connection: _Connection) -> None:
+        attempt = 0
+        while self._started and connection.addresses:
+            try:
+                async with self._get_session().ws_connect(
+                    self.url,
+                    params={"x-api-key": self.api_key},
+                    headers={"Origin": "ws://public-api.birdeye.so"},
+                    protocols=("echo-protocol",),
+                    heartbeat=self.heartbeat,
+                ) as ws:
+                    connection.ws, connection.subscribed = ws, set()
+                    PRICE_STREAM_CONNECTIONS.set(sum(1 for other in self.connections if other.open))
+                    logger.info(f"Price stream connection {connection.number} open for {len(connection.addresses)} tokens")
+                    await self._subscribe(connection)
+                    attempt = 0
+                    async for message in ws:
+                        if message.type == aiohttp.WSMsgType.TEXT:
+                            self._handle(connection, message.data)
+                        elif message.type == aiohttp.WSMsgType.ERROR:
+                            break
+                    if self._started:
+                        logger.warning(f"Price stream connection {connection.number} closed, polling its tokens until it is back")
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                # Response errors carry the URL, and with it the API key, so only their status is logged
+                reason = f"status {e.status}" if isinstance(e, aiohttp.ClientResponseError) else type(e).__name__
+                if attempt == 0:
+                    logger.error(f"Price stream connection {connection.number} failed ({reason}), polling its tokens until it is back")
+                else:
+                    logger.debug(f"Price stream connection {connection.number} retry {attempt} failed ({reason})")
+            finally:
+                connection.ws, connection.subscribed = None, set()
+                PRICE_STREAM_CONNECTIONS.set(sum(1 for other in self.connections if other.open))
+                PRICE_STREAM_TOKENS.set(self.live_tokens())
+
+            if not self._started:
+                break
+            # Its tokens are polled again until the socket is back
+            PRICE_STREAM_RECONNECTS.inc()
+            await asyncio.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_max))
+            attempt += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "tokens": len(self._owner),
+            "live_tokens": self.live_tokens(),
+            "open_connections": sum(1 for connection in self.connections if connection.open),
+        }
@@ -0,0 +1,115 @@
+from contextvars import ContextVar
+from enum import IntEnum
+from itertools import count
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import heapq
+import time
+
+
+class Priority(IntEnum):
+    """Lower value is served first"""
+
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+# Set by callers (e.g. slash command handlers) so every Birdeye call made from that task inherits the priority
+request_priority: ContextVar[Priority] = ContextVar("request_priority", default=Priority.BACKGROUND)
+
+
+class PriorityRateLimiter:
+    """Token bucket shared by all Birdeye requests.
+
+    ``rate`` tokens are added per second up to ``burst``. When the bucket is empty callers queue up and are
+    released strictly by priority, then in arrival order, so interactive commands jump ahead of the sweep.
+    """
+
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic) -> None:
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._waiters: List[Tuple[int, int, float, asyncio.Future]] = []
+        self._seq = count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._stats: Dict[Priority, Dict[str, float]] = {
+            priority: {"acquired": 0, "waited": 0, "total_wait": 0.0, "max_wait": 0.0} for priority in Priority
+        }
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _record(self, priority: Priority, wait: float) -> None:
+        stats = self._stats[priority]
+        stats["acquired"] += 1
+        if wait > 0:
+            stats["waited"] += 1
+            stats["total_wait"] += wait
+            stats["max_wait"] = max(stats["max_wait"], wait)
+
+    async def acquire(self, priority: Priority = Priority.BACKGROUND) -> None:
+        self._refill()
+        if not self._waiters and self._tokens >= 1:
+            self._tokens -= 1
+            self._record(priority, 0.0)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._seq), self.clock(), future))
+        self._schedule()
+        await future
+
+    def _schedule(self) -> None:
+        if self._timer is not None or not self._waiters:
+            return
+        delay = max(0.0, (1 - self._tokens) / self.rate)
+        self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    def _dispatch(self) -> None:
+        self._timer = None
+        self._refill()
+
+        while self._waiters and self._tokens >= 1:
+            priority, _, queued_at, future = heapq.heappop(self._waiters)
+            if future.done():  # the caller was cancelled while waiting
+                continue
+            self._tokens -= 1
+            self._record(Priority(priority), self.clock() - queued_at)
+            future.set_result(None)
+
+        # Drop cancelled waiters at the top so they do not keep the timer alive
+        while self._waiters and self._waiters[0][3].done():
+            heapq.heappop(self._waiters)
+        self._schedule()
+
+    def queue_depth(self) -> Dict[str, int]:
+        depth = {priority.name.lower(): 0 for priority in Priority}
+        for priority, _, _, future in self._waiters:
+            if not future.done():
+                depth[Priority(priority).name.lower()] += 1
+        return depth
+
+    def stats(self) -> Dict[str, Any]:
+        now = self.clock()
+        oldest = min((queued_at for _, _, queued_at, future in self._waiters if not future.done()), default=None)
+        per_priority = {}
+        for priority, stats in self._stats.items():
+            per_priority[priority.name.lower()] = {
+                **stats,
+                "avg_wait": stats["total_wait"] / stats["acquired"] if stats["acquired"] else 0.0,
+            }
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "tokens": self._tokens,
+            "queue_depth": self.queue_depth(),
+            "oldest_wait": now - oldest if oldest is not None else 0.0,
+            "priorities": per_priority,
+        }
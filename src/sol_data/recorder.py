@@ -0,0 +1,89 @@
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import gzip
+import json
+
+ParamsKey = Tuple[Tuple[str, str], ...]
+RequestKey = Tuple[str, str, ParamsKey]
+
+
+def params_key(params: Dict[str, Any]) -> ParamsKey:
+    return tuple(sorted((k, str(v)) for k, v in params.items()))
+
+
+class TrafficRecorder:
+    """Appends every Birdeye exchange to a gzip compressed JSONL file.
+
+    One line per request: when it started, how long it took, endpoint, params and the raw response status, body and
+    Retry-After.
+    """
+
+    def __init__(self, path: str, flush_every: int = 100) -> None:
+        self.path = path
+        self.flush_every = flush_every
+        self._file = gzip.open(path, "at", encoding="utf-8")
+        self._unflushed = 0
+
+    def record(self, method: str, endpoint: str, params: Dict[str, Any], status: int, reason: str, body: bytes, started_at: float, elapsed: float, retry_after: Optional[float] = None) -> None:
+        line = {
+            "ts": started_at,
+            "elapsed": elapsed,
+            "method": method,
+            "endpoint": endpoint,
+            "params": dict(params_key(params)),
+            "status": status,
+            "reason": reason,
+            "body": body.decode("utf-8", errors="replace"),
+            "retry_after": retry_after,
+        }
+        self._file.write(json.dumps(line, separators=(",", ":")) + "\n")
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every:
+            self._file.flush()
+            self._unflushed = 0
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class TrafficReplayer:
+    """Serves responses from a recording instead of calling Birdeye.
+
+    Repeated requests get their recorded responses in order, the last one is repeated once they run out, so a replay
+    is deterministic. With ``timing="original"`` every response takes as long as it did when recorded, with
+    ``"fast"`` it comes back immediately.
+    """
+
+    def __init__(self, path: str, timing: str = "fast") -> None:
+        if timing not in ("fast", "original"):
+            raise ValueError(f"Unknown replay timing {timing!r}, use 'fast' or 'original'")
+        self.path = path
+        self.timing = timing
+        self.recordings: Dict[RequestKey, List[Dict[str, Any]]] = defaultdict(list)
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    exchange = json.loads(line)
+                    self.recordings[(exchange["method"], exchange["endpoint"], params_key(exchange["params"]))].append(exchange)
+        self._served: Dict[RequestKey, int] = defaultdict(int)
+
+    def __len__(self) -> int:
+        return sum(len(exchanges) for exchanges in self.recordings.values())
+
+    def params_for(self, endpoint: str) -> List[Dict[str, str]]:
+        """Distinct recorded params of an endpoint, e.g. the wallets a recorded sweep looked at"""
+        return [dict(params) for _, recorded_endpoint, params in self.recordings if recorded_endpoint == endpoint]
+
+    async def respond(self, method: str, endpoint: str, params: Dict[str, Any]) -> Optional[Tuple[int, str, bytes, Optional[float]]]:
+        """Recorded (status, reason, body, retry_after) for the request, None if it was never recorded"""
+        key = (method, endpoint, params_key(params))
+        exchanges = self.recordings.get(key)
+        if not exchanges:
+            return None
+
+        exchange = exchanges[min(self._served[key], len(exchanges) - 1)]
+        self._served[key] += 1
+        if self.timing == "original":
+            await asyncio.sleep(exchange["elapsed"])
+        return exchange["status"], exchange["reason"], exchange["body"].encode("utf-8"), exchange.get("retry_after")
@@ -0,0 +1,71 @@
+from typing import Callable, Optional
+import random
+import time
+
+
+def backoff_delay(attempt: int, base: float, cap: float, rng: Callable[[], float] = random.random) -> float:
+    """Full jitter exponential backoff: anywhere between 0 and ``base * 2**attempt``, at most ``cap``"""
+    return rng() * min(cap, base * 2**attempt)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header; the HTTP-date form is not used by Birdeye and is ignored"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+class CircuitBreaker:
+    """Fails fast while an endpoint keeps failing instead of queueing more requests against it.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and every call is refused for
+    ``reset_timeout`` seconds. Then a single trial call is let through (half-open): success closes the circuit,
+    failure opens it for another ``reset_timeout``.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if self.clock() - self._opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+        if self._trial_in_flight:
+            return False
+        self._trial_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def release(self) -> None:
+        """Give up a call ``allow`` let through without recording an outcome, e.g. when it was cancelled"""
+        self._trial_in_flight = False
+
+    def record_failure(self) -> bool:
+        """Count a failure, True if it just opened the circuit"""
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+            self.state = self.OPEN
+            self._opened_at = self.clock()
+            return True
+        return False
@@ -0,0 +1,132 @@
+import asyncio
+import time
+import unittest
+
+from src.alerts.cooldown import AlertCooldown
+from src.alerts.planner import AlertCyclePlanner, Subscriber
+from src.alerts.polling import AdaptivePollScheduler
+from src.sol_data.data_models import (
+    TokenCreationInfoResponse,
+    TokenHoldersResponse,
+    TokenOverviewResponse,
+    TokenSecurityResponse,
+    WalletPortfolioItem,
+    WalletPortfolioResponse,
+)
+
+TOKEN = "token1"
+
+
+class StubDataManager:
+    """Answers the planner's Birdeye calls from fixed data"""
+
+    def __init__(self, overview: TokenOverviewResponse) -> None:
+        self.overview = overview
+
+    async def get_wallet_portfolio(self, wallet_address: str) -> WalletPortfolioResponse:
+        return WalletPortfolioResponse(items=[WalletPortfolioItem(address=TOKEN, symbol="TKN", name="Token")])
+
+    async def get_token_overview(self, address: str, fields=None) -> TokenOverviewResponse:
+        return self.overview
+
+    async def get_token_creation_info(self, address: str) -> TokenCreationInfoResponse:
+        return TokenCreationInfoResponse()
+
+    async def get_token_security(self, address: str) -> TokenSecurityResponse:
+        return TokenSecurityResponse()
+
+    async def get_token_holders(self, address: str) -> TokenHoldersResponse:
+        return TokenHoldersResponse()
+
+
+def flat_over_5m(**fields) -> TokenOverviewResponse:
+    """Up 40% over the hour, not moved at all over the last 5 minutes"""
+    values = dict(
+        symbol="TKN",
+        price=1.4,
+        history1mPrice=1.4,
+        history5mPrice=1.4,
+        history30mPrice=1.2,
+        history1hPrice=1.0,
+        priceChange1mPercent=0.0,
+        priceChange5mPercent=0.0,
+        priceChange30mPercent=16.7,
+        priceChange1hPercent=40.0,
+        totalSupply=1_000_000.0,
+    )
+    values.update(fields)
+    return TokenOverviewResponse(**values)
+
+
+class WindowMatchingTest(unittest.TestCase):
+    def run_planner(self, planner: AlertCyclePlanner, subscribers):
+        return asyncio.run(planner.run(subscribers, apply_cooldown=False))
+
+    def test_1h_subscriber_alerted_on_token_flat_over_5m(self):
+        planner = AlertCyclePlanner(StubDataManager(flat_over_5m()))
+        alerts = self.run_planner(planner, [Subscriber(1, "wallet1", 10.0, "1h"), Subscriber(2, "wallet2", 10.0, "5m")])
+
+        self.assertEqual([alert.token.address for alert in alerts[1]], [TOKEN])
+        self.assertAlmostEqual(alerts[1][0].change, 40.0, places=3)
+        self.assertEqual(alerts[1][0].window, "1h")
+        self.assertEqual(alerts[2], [])
+
+    def test_birdeye_change_used_without_history_prices(self):
+        overview = flat_over_5m(price=None, history1mPrice=None, history5mPrice=None, history30mPrice=None, history1hPrice=None, priceChange5mPercent=None)
+        planner = AlertCyclePlanner(StubDataManager(overview))
+        alerts = self.run_planner(planner, [Subscriber(1, "wallet1", 10.0, "1h")])
+
+        self.assertEqual(len(alerts[1]), 1)
+        self.assertAlmostEqual(alerts[1][0].change, 40.0)
+
+    def test_token_skipped_when_no_window_resolves(self):
+        overview = flat_over_5m(price=None, history1hPrice=None, priceChange1hPercent=None)
+        planner = AlertCyclePlanner(StubDataManager(overview))
+        alerts = self.run_planner(planner, [Subscriber(1, "wallet1", 10.0, "1h")])
+
+        self.assertEqual(alerts[1], [])
+        self.assertEqual(planner.last_stats.enriched_tokens, 0)
+
+    def test_unknown_change_does_not_rearm_cooldown(self):
+        cooldown = AlertCooldown(cooldown=0)
+        subscribers = [Subscriber(1, "wallet1", 10.0, "1h"), Subscriber(2, "wallet2", 10.0, "5m")]
+        asyncio.run(AlertCyclePlanner(StubDataManager(flat_over_5m()), cooldown=cooldown).run(subscribers))
+        self.assertFalse(cooldown._memory[1, TOKEN]["armed"])
+
+        # Next cycle only the 5m change is known, the 1h holder's alert must stay disarmed
+        overview = flat_over_5m(history30mPrice=None, history1hPrice=None, priceChange1hPercent=None)
+        alerts = asyncio.run(AlertCyclePlanner(StubDataManager(overview), cooldown=cooldown).run(subscribers))
+        self.assertEqual(alerts[1], [])
+        self.assertFalse(cooldown._memory[1, TOKEN]["armed"])
+
+
+class PollIntervalTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.poller = AdaptivePollScheduler(base_interval=300, min_interval=60, max_interval=900)
+        self.overview = TokenOverviewResponse(priceChange1mPercent=1.0, trade5m=100, uniqueWallet5m=50)
+
+    def test_smallest_distance_over_windows_wins(self):
+        # 5m is 19 points away, 1h only 2
+        interval = self.poller.interval(self.overview, {"5m": 20.0, "1h": 10.0}, {"5m": 1.0, "1h": 8.0})
+        self.assertEqual(interval, 60)
+        self.assertEqual(self.poller.interval(self.overview, {"5m": 20.0}, {"5m": 1.0}), 300)
+
+    def test_token_over_one_window_threshold_is_polled_fast(self):
+        self.assertEqual(self.poller.interval(self.overview, {"5m": 20.0, "1h": 10.0}, {"5m": 0.0, "1h": 40.0}), 60)
+
+    def test_missing_5m_change_uses_the_other_windows(self):
+        self.assertEqual(self.poller.interval(self.overview, {"1h": 10.0}, {"5m": None, "1h": 9.5}), 60)
+        self.assertEqual(self.poller.interval(self.overview, {"5m": 10.0}, {"5m": None}), 300)
+
+    def test_planner_schedules_by_the_holders_window(self):
+        poller = AdaptivePollScheduler(base_interval=300, min_interval=60, max_interval=900)
+        planner = AlertCyclePlanner(StubDataManager(flat_over_5m()), poller=poller)
+        now = time.time()
+        asyncio.run(planner.run([Subscriber(1, "wallet1", 10.0, "1h")]))
+        # Over the 1h threshold, so the next poll comes after min_interval rather than by the flat 5m change
+        self.assertFalse(poller.is_due(TOKEN, now + 30))
+        self.assertTrue(poller.is_due(TOKEN, now + 61))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,25 @@
+import unittest
+
+from src.alerts.polling import AdaptivePollScheduler
+
+
+class CacheTtlTest(unittest.TestCase):
+    def test_min_interval_is_raised_to_the_cache_ttl(self):
+        poller = AdaptivePollScheduler(base_interval=300, min_interval=60, cache_ttl=120)
+        self.assertEqual(poller.min_interval, 120)
+
+    def test_shorter_cache_ttl_keeps_min_interval(self):
+        poller = AdaptivePollScheduler(base_interval=300, min_interval=60, cache_ttl=30)
+        self.assertEqual(poller.min_interval, 60)
+
+    def test_only_cached_overviews_are_fetched_early(self):
+        poller = AdaptivePollScheduler(base_interval=300, min_interval=60, cache_ttl=30)
+        poller._polled_at["token"] = 0.0
+        poller._next_due["token"] = 300.0
+        self.assertTrue(poller.should_fetch("token", 20.0))
+        self.assertFalse(poller.should_fetch("token", 45.0))
+        self.assertTrue(poller.should_fetch("token", 300.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import asyncio
+import time
+import unittest
+
+from src.alerts.prefilter import PricePrefilter
+from src.sol_data.data_models import MultiPriceResponse, Price
+
+
+class StubDataManager:
+    def __init__(self, prices) -> None:
+        self.prices = prices
+
+    async def get_multi_price(self, addresses):
+        return MultiPriceResponse({address: self.prices[address] for address in addresses if address in self.prices})
+
+
+def price(value: float, liquidity: float = 1e6) -> Price:
+    now = int(time.time())
+    return Price(value=value, updateUnixTime=now, updateHumanTime="", priceChange24h=0.0, liquidity=liquidity)
+
+
+class PartitionTest(unittest.TestCase):
+    def test_only_compared_tokens_are_reported_below(self):
+        prices = {"flat": price(1.0), "pumped": price(1.5), "fresh": price(1.0), "illiquid": price(1.0, liquidity=10)}
+        prefilter = PricePrefilter(StubDataManager(prices), min_liquidity=1000)
+        five_minutes_ago = time.time() - 300
+        for address in ("flat", "pumped", "illiquid"):
+            prefilter.history.record(address, 1.0, five_minutes_ago)
+
+        thresholds = {address: {"5m": 10.0} for address in ("flat", "pumped", "fresh", "illiquid", "unpriced")}
+        candidates, below = asyncio.run(prefilter.partition(thresholds))
+
+        # fresh has no reference yet, so it might have moved
+        self.assertEqual(sorted(candidates), ["fresh", "pumped"])
+        # unpriced and illiquid were never compared, they count neither way
+        self.assertEqual(below, {"flat"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+from src.alerts.index import SubscriptionIndex
+
+
+class SplitTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.index = SubscriptionIndex()
+        self.index.update(1, 10.0, ["a", "b"])
+        self.index.update(2, 20.0, ["a"])
+        self.index.update(3, -5.0, ["a"])
+
+    def split(self, address, change, window="5m"):
+        matched, rest = self.index.split(address, change, window)
+        return sorted(matched), sorted(rest)
+
+    def test_threshold_equal_to_change_matches(self):
+        self.assertEqual(self.split("a", 10.0), ([1, 3], [2]))
+        self.assertEqual(self.split("a", 20.0), ([1, 2, 3], []))
+
+    def test_change_just_below_threshold_does_not_match(self):
+        self.assertEqual(self.split("a", 9.999), ([3], [1, 2]))
+
+    def test_negative_changes(self):
+        self.assertEqual(self.split("a", -5.0), ([3], [1, 2]))
+        self.assertEqual(self.split("a", -30.0), ([], [1, 2, 3]))
+
+    def test_unknown_change_matches_nobody(self):
+        self.assertEqual(self.split("a", None), ([], [1, 2, 3]))
+
+    def test_unknown_token_and_other_window(self):
+        self.assertEqual(self.split("missing", 50.0), ([], []))
+        self.assertEqual(self.split("a", 50.0, "1h"), ([], []))
+
+    def test_removed_user_no_longer_matches(self):
+        self.index.remove(1)
+        self.assertEqual(self.split("a", 50.0), ([2, 3], []))
+        self.assertEqual(self.split("b", 50.0), ([], []))
+        self.assertNotIn("b", self.index)
+
+    def test_re_added_with_new_threshold(self):
+        self.index.remove(1)
+        self.index.update(1, 30.0, ["a"])
+        self.assertEqual(self.split("a", 20.0), ([2, 3], [1]))
+        self.assertEqual(self.split("a", 30.0), ([1, 2, 3], []))
+        self.assertEqual(self.index.min_threshold("a"), -5.0)
+
+    def test_threshold_change_resorts_existing_holdings(self):
+        self.index.set_threshold(2, 1.0)
+        self.assertEqual(self.split("a", 1.0), ([2, 3], [1]))
+        self.index.set_threshold(2, 1.0, "1h")
+        self.assertEqual(self.split("a", 1.0), ([3], [1]))
+        self.assertEqual(self.split("a", 1.0, "1h"), ([2], []))
+
+    def test_equal_thresholds_keep_every_holder(self):
+        self.index.update(4, 10.0, ["a"])
+        self.index.update(5, 10.0, ["a"])
+        self.index.remove(4)
+        self.assertEqual(self.split("a", 10.0), ([1, 3, 5], [2]))
+
+
+if __name__ == "__main__":
+    unittest.main()
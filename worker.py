@@ -0,0 +1,5 @@
+from src.alerts.worker import run_worker
+
+
+if __name__ == "__main__":
+    run_worker()
\ No newline at end of file